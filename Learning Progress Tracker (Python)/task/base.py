@@ -1,20 +1,54 @@
 import cmd
+import itertools
+import re
+import sys
+
+from metrics import Metrics
+from reader import BlockReader
+from service import TrackerService
+from store import Store
+
+COMMAND = re.compile('[a-zA-Z0-9_]*')  # What cmd.Cmd.parseline takes as one
 
 
 class Maim(cmd.Cmd):
     """Base class mainly for maiming prompt and help"""
     prompt = ''
-    student_data: dict
+    service: TrackerService
+    metrics: Metrics | None = None  # Shared by all shells, see metrics.py
+
+    @property
+    def student_data(self) -> Store:
+        return self.service.student_data
 
     def do_help(self, arg):
         self.default('help ' + arg)
 
+    def onecmd(self, line):
+        if self.metrics is None:
+            return super().onecmd(line)
+        command, _, line = self.parseline(line)
+        if not line:
+            name = 'emptyline'
+        elif command and hasattr(self, 'do_' + command):
+            name = command
+        else:
+            name = 'default'
+        return self.metrics.time(self, name, super().onecmd, line)
+
+    def enter(self, shell):
+        """Run a subshell until it returns, see batch.py for a faster way"""
+        shell.cmdloop()
+
 
 class Subshell(Maim):
     """Base class for all subshells"""
+    CHUNK_SIZE = 1 << 20  # Bytes of a file read at once by read_chunks
+    CHUNK_LINES = 10_000  # Lines of stdin read at once by read_chunks
+    streams_input = False  # Whether cmdloop passes piped data lines to default
 
-    def __init__(self, student_data):
-        self.student_data = student_data
+    def __init__(self, service: TrackerService):
+        self.service = service
         super().__init__()
 
     def emptyline(self):
@@ -36,3 +70,57 @@ class Subshell(Maim):
         except AttributeError:
             pass
         return line
+
+    def cmdloop(self, intro=None):
+        """Run as cmd.Cmd.cmdloop does, but if streams_input is set and
+        stdin is a BlockReader, pass lines which are not commands
+        straight to default, skipping precmd and onecmd"""
+        if not (self.streams_input and self.metrics is None
+                and isinstance(sys.stdin, BlockReader)
+                and type(self).precmd is Subshell.precmd):
+            return super().cmdloop(intro)
+
+        self.preloop()
+        if intro is not None:
+            self.intro = intro
+        if self.intro:
+            self.stdout.write(str(self.intro) + '\n')
+        names = {name.removeprefix('do_') for name in self.get_names()
+                 if name.startswith('do_')}
+        starts = {name[0] for name in names}
+        starts |= {start.upper() for start in starts} | {'?'}
+        # Once input ends, cmd.Cmd.cmdloop reads 'EOF' lines
+        lines = itertools.chain(sys.stdin.lines(), itertools.repeat('EOF'))
+        default = self.default
+        for line in lines:
+            first = line[:1]
+            if (first in starts or first.isspace()) and self.is_command(line, names):
+                line = self.precmd(line)
+                if self.postcmd(self.onecmd(line), line):
+                    break
+            else:
+                default(line.strip())
+        self.postloop()
+
+    @staticmethod
+    def is_command(line, names) -> bool:
+        """Return whether onecmd would run a command given line
+        by precmd, instead of default with line stripped"""
+        if line.lower() in names:
+            return True
+        line = line.strip()
+        return line[:1] == '?' or COMMAND.match(line).group() in names
+
+    def read_chunks(self, path):
+        """Yield lists of lines read from a file,
+        or from stdin up to a 'back' line if path is '-'"""
+        if path == '-':
+            lines = itertools.takewhile(
+                lambda line: line.strip().lower() != 'back', sys.stdin)
+            while chunk := list(itertools.islice(lines, self.CHUNK_LINES)):
+                yield chunk
+            return
+
+        with open(path, newline='') as file:
+            while chunk := file.readlines(self.CHUNK_SIZE):
+                yield chunk
@@ -0,0 +1,145 @@
+"""Batch mode: run a stream of commands without cmd.Cmd.cmdloop
+
+Commands go to the same do_* handlers as in an interactive session
+and print exactly the same output, but:
+* every shell class gets a table of its handlers built once,
+  instead of a getattr per line,
+* subshells are pushed on a stack instead of running a nested cmdloop,
+* output is collected by one buffered writer instead of being written
+  on every print.
+
+While a batch runs, sys.stdin is the command stream, so
+`add points from -` reads the lines following it, as it does
+interactively.
+"""
+import sys
+import time
+from contextlib import redirect_stdout
+
+from base import Maim, Subshell
+
+
+class Output:
+    """Text writer passing on what it collects once BUFFER_SIZE
+    characters have accumulated"""
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, target):
+        self.target = target
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.BUFFER_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        self.target.write(''.join(self.parts))
+        self.target.flush()
+        self.parts.clear()
+        self.size = 0
+
+
+class Batch:
+    def __init__(self, shell: Maim):
+        self.shell = shell
+        self.stack = []  # (shell, line which entered it)
+        self.tables = {}
+        self.line = None
+        self.commands = 0
+
+    def table(self, shell_class) -> dict:
+        """Return handlers of a shell class by command name"""
+        if shell_class not in self.tables:
+            self.tables[shell_class] = {
+                name.removeprefix('do_'): getattr(shell_class, name)
+                for name in dir(shell_class) if name.startswith('do_')}
+        return self.tables[shell_class]
+
+    def enter(self, shell: Maim):
+        """Start a shell as cmdloop would, without looping"""
+        shell.enter = self.enter
+        self.stack.append((shell, self.line))
+        shell.preloop()
+        if shell.intro:
+            print(shell.intro)
+
+    def leave(self):
+        """Stop the current shell and finish the command which entered it,
+        return whether its shell stops too"""
+        shell, line = self.stack.pop()
+        shell.postloop()
+        if self.stack:
+            return self.stack[-1][0].postcmd(None, line)
+
+    def precmd(self, shell, line):
+        if type(shell).precmd is Subshell.precmd:  # Skip its getattr
+            lower = line.lower()
+            return lower if lower in self.table(type(shell)) else line
+        return shell.precmd(line)
+
+    def onecmd(self, shell, line):
+        """Dispatch a line as cmd.Cmd.onecmd does"""
+        command, arg, line = shell.parseline(line)
+        handler = self.table(type(shell)).get(command) if command else None
+        if shell.metrics is not None:
+            name = ('emptyline' if not line else 'default' if handler is None
+                    else command)
+            return shell.metrics.time(
+                shell, name, self.dispatch, shell, handler, arg, line)
+        return self.dispatch(shell, handler, arg, line)
+
+    @staticmethod
+    def dispatch(shell, handler, arg, line):
+        if not line:
+            return shell.emptyline()
+        if handler is None:
+            return shell.default(line)
+        return handler(shell, arg)
+
+    def step(self, line) -> bool:
+        """Run one command in the current shell,
+        return whether the outermost shell has stopped"""
+        self.commands += 1
+        shell = self.stack[-1][0]
+        line = self.precmd(shell, line.removesuffix('\n'))
+        self.line = line
+        stop = self.onecmd(shell, line)
+        if self.stack[-1][0] is not shell:
+            return False  # Its postcmd runs once the subshell stops
+        stop = shell.postcmd(stop, line)
+        while stop and self.stack:
+            stop = self.leave()
+        return not self.stack
+
+    def run(self, lines):
+        """Run commands from lines until the outermost shell stops"""
+        self.enter(self.shell)
+        for line in lines:
+            if self.step(line):
+                return
+
+
+def run(shell: Maim, path=None):
+    """Run commands from a file, or stdin if path is None,
+    and report their rate on stderr"""
+    stream = open(path) if path is not None else sys.stdin
+    stdin = sys.stdin
+    output = Output(sys.stdout)
+    batch = Batch(shell)
+    start = time.perf_counter()
+    try:
+        sys.stdin = stream
+        with redirect_stdout(output):
+            batch.run(stream)
+    finally:
+        sys.stdin = stdin
+        output.flush()
+        if path is not None:
+            stream.close()
+    seconds = time.perf_counter() - start
+    print(f'{batch.commands} commands in {seconds:.3f} s '
+          f'({batch.commands / seconds:,.0f} commands/s)', file=sys.stderr)
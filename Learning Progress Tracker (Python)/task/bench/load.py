@@ -0,0 +1,88 @@
+"""Load generator for server mode
+
+Run from the task directory: python -m bench.load [--clients N] ...
+
+Starts a server with `main.py --serve` unless --port is given, then
+connects all clients at once. Each client pipelines a whole session:
+it adds students, adds points to random ids, finds students and opens
+statistics, sending every line before reading any output.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from bench.memory import roster
+
+
+def script(client, students, updates, seed=0) -> [str, ...]:
+    """Return lines of one client session"""
+    rng = random.Random(seed + client)
+    lines = ['add students']
+    lines += [f"{creds['first name']} {creds['last name']} c{client}.{creds['email']}"
+              for creds in roster(students, seed + client)]
+    lines += ['back', 'add points']
+    high_id = students * (client + 1)  # Ids likely taken by now
+    lines += [f'{rng.randint(1, high_id)} ' + ' '.join(
+        str(rng.choice((0, rng.randint(1, 20)))) for _ in range(4))
+        for _ in range(updates)]
+    lines += ['back', 'find']
+    lines += [str(rng.randint(1, high_id)) for _ in range(updates // 10)]
+    lines += ['back', 'statistics', 'python top 10', 'dsa page 2',
+              f'rank {rng.randint(1, high_id)} flask', 'back', 'list', 'exit']
+    return lines
+
+
+async def client(port, lines) -> (float, int):
+    """Run a session, return its seconds and bytes of output"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(''.join(line + '\n' for line in lines).encode())
+    output = await reader.read()
+    writer.close()
+    return time.perf_counter() - start, len(output)
+
+
+async def load(port, clients, students, updates):
+    scripts = [script(i, students, updates) for i in range(clients)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(port, lines) for lines in scripts))
+    seconds = time.perf_counter() - start
+
+    commands = sum(map(len, scripts))
+    latencies = sorted(result[0] for result in results)
+    print(f'{clients} clients, {commands:,} commands in {seconds:.3f} s '
+          f'({commands / seconds:,.0f} commands/s, '
+          f'{sum(result[1] for result in results):,} bytes out)')
+    print(f'session seconds: median {statistics.median(latencies):.3f}, '
+          f'max {latencies[-1]:.3f}')
+
+
+def start_server(store) -> (subprocess.Popen, int):
+    process = subprocess.Popen(
+        [sys.executable, 'main.py', '--store', store, '--serve', '0'],
+        stdout=subprocess.PIPE, text=True)
+    port = int(process.stdout.readline().rsplit(':', 1)[1])
+    return process, port
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, help='of a running server')
+    parser.add_argument('--store', default='dict')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--students', type=int, default=1000,
+                        help='added by each client')
+    parser.add_argument('--updates', type=int, default=5000,
+                        help='point updates by each client')
+    args = parser.parse_args()
+    process, port = (None, args.port) if args.port else start_server(args.store)
+    try:
+        asyncio.run(load(port, args.clients, args.students, args.updates))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
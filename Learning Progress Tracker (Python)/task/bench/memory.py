@@ -0,0 +1,68 @@
+"""Memory used per student by each in-memory representation
+
+Run from the task directory: python -m bench.memory [SCALE ...]
+
+'dict of dicts' is the layout DictStore used before Student records.
+Stores also count their email index, which that layout did not have.
+"""
+import random
+import sys
+import tracemalloc
+
+from store import DictStore, ColumnarStore
+
+FIRST_NAMES = ['Shoshana', 'Marisa', 'Gwenette', 'Charlena', 'Alexina',
+               'Karee', 'Dolley', 'Elysha', 'Trixie', 'Ricki', 'Amye']
+LAST_NAMES = ['Utica', 'Firman', 'Anagnos', 'Girardo', 'Belcher',
+              'Antoinetta', 'Panther', 'Quinlan', 'Winer', 'Trovillion']
+SCALES = (10 ** 5, 10 ** 6)
+
+
+def roster(n, seed=0):
+    """Yield n credentials with names drawn from a small pool"""
+    rng = random.Random(seed)
+    for i in range(n):
+        # Built from parts like parsed input, not shared literals
+        yield {'first name': ''.join(rng.choice(FIRST_NAMES)),
+               'last name': ' '.join([rng.choice(LAST_NAMES)]),
+               'email': f'address{i}@mail.com'}
+
+
+def dict_of_dicts(n):
+    data = {}
+    for student_id, creds in enumerate(roster(n)):
+        data[student_id] = creds | {'points': [0, 1, 2, 3],
+                                    'submissions': [0, 1, 1, 1]}
+    return data
+
+
+def store(store_class):
+    def build(n):
+        student_data = store_class()
+        student_data.add_students(roster(n))
+        return student_data
+    return build
+
+
+LAYOUTS = {'dict of dicts': dict_of_dicts,
+           'dict of Student records': store(DictStore),
+           'columnar': store(ColumnarStore)}
+
+
+def bytes_per_student(build, n) -> float:
+    tracemalloc.start()
+    try:
+        built = build(n)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del built
+    return size / n
+
+
+if __name__ == '__main__':
+    scales = [int(arg) for arg in sys.argv[1:]] or SCALES
+    print(f'{"layout":<26}' + ''.join(f'{n:>12,}' for n in scales))
+    for name, build in LAYOUTS.items():
+        print(f'{name:<26}' + ''.join(
+            f'{bytes_per_student(build, n):>12.1f}' for n in scales))
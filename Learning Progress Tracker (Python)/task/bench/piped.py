@@ -0,0 +1,50 @@
+"""Seconds of a piped interactive session adding students and points
+
+Run from the task directory: python -m bench.piped [STUDENTS]
+
+The session adds STUDENTS students, then a points line for each of
+them, through a Tracker's cmdloop as `python main.py < file` runs it.
+'text stdin' reads a TextIOWrapper, as before reader.py, which goes
+through input(), precmd and onecmd for every line. 'block reader'
+reads a BlockReader, as main.py now sets up for piped stdin.
+"""
+import io
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from bench.suite import points_lines, roster_lines
+from reader import BlockReader
+from tracker import Tracker
+
+STUDENTS = 10 ** 5
+
+
+def script(n) -> bytes:
+    lines = ['add students', *roster_lines(n), 'back',
+             'add points', *points_lines(n), 'back', 'exit']
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def measure(stdin) -> float:
+    with tempfile.TemporaryFile('w') as file, redirect_stdout(file):
+        tracker = Tracker()  # Its cmd.Cmd.stdout is the file
+        sys.stdin = stdin
+        try:
+            start = time.perf_counter()
+            tracker.cmdloop()
+            file.flush()
+            return time.perf_counter() - start
+        finally:
+            sys.stdin = sys.__stdin__
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else STUDENTS
+    data = script(n)
+    for name, stdin in (
+            ('text stdin', lambda: io.TextIOWrapper(io.BytesIO(data))),
+            ('block reader', lambda: BlockReader(io.BytesIO(data)))):
+        seconds = measure(stdin())
+        print(f'{name:<14}{seconds:>8.3f} s{2 * n / seconds:>14,.0f} lines/s')
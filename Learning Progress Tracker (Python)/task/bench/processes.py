@@ -0,0 +1,55 @@
+"""Seconds of the heavy operations of a ProcessStore by number of workers
+
+Run from the task directory: python -m bench.processes [WORKERS ...]
+
+Each run ingests POINTS_ROWS points rows in bulk, then sums a column
+over all students, builds every full course table and drains the
+completion queue. A DictStore in this process is the baseline.
+Speedups need as many free cores as workers.
+"""
+import sys
+import time
+
+import numpy as np
+
+from bench.memory import roster
+from store import DictStore, ProcessStore, group_by_student
+
+STUDENTS = 10 ** 5
+POINTS_ROWS = 10 ** 6
+WORKERS = (1, 2, 4)
+
+
+def run(student_data) -> dict:
+    student_data.add_students(roster(STUDENTS))
+    rng = np.random.default_rng(0)
+    student_ids, points, submissions, _ = group_by_student(
+        rng.integers(1, STUDENTS + 1, POINTS_ROWS),
+        rng.integers(0, 10, (POINTS_ROWS, 4)))
+    seconds = {}
+
+    start = time.perf_counter()
+    student_data.add_points_bulk(student_ids.tolist(), points, submissions)
+    student_data.column_sum('points')  # Waits for the workers to finish
+    seconds['ingest'] = time.perf_counter() - start
+
+    for name, operation in (
+            ('column sum', lambda: student_data.column_sum('submissions')),
+            ('course tables', lambda: [student_data.course_stats(course)
+                                       for course in range(4)]),
+            ('completions', student_data.pending_completions)):
+        start = time.perf_counter()
+        operation()
+        seconds[name] = time.perf_counter() - start
+    student_data.close()
+    return seconds
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or WORKERS
+    rows = {'dict': run(DictStore())}
+    rows.update((f'{n} workers', run(ProcessStore(n))) for n in counts)
+    names = list(rows['dict'])
+    print(f'{"store":<12}' + ''.join(f'{name:>15}' for name in names))
+    for store, seconds in rows.items():
+        print(f'{store:<12}' + ''.join(f'{seconds[name]:>15.3f}' for name in names))
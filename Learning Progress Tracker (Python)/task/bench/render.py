@@ -0,0 +1,72 @@
+"""Seconds and peak memory of printing a full course table and 'list'
+
+Run from the task directory: python -m bench.render [STUDENTS]
+
+'per row' prints as Stats.print_course and Tracker.do_list did before
+the render module: one str.format call per row, then print of all
+lines at once. 'render' is what they do now. Output goes to a file
+on disk through sys.stdout, so it takes the binary buffer path.
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from bench.memory import roster
+from store import DictStore, group_by_student
+from subshells import Stats
+from tracker import Tracker
+
+STUDENTS = 10 ** 6
+
+
+def build(n) -> Tracker:
+    student_data = DictStore()
+    student_data.add_students(roster(n))
+    rng = np.random.default_rng(0)
+    student_ids, points, submissions, _ = group_by_student(
+        np.arange(1, n + 1), rng.integers(1, 100, (n, 4)))
+    student_data.add_points_bulk(student_ids.tolist(), points, submissions)
+    return Tracker(student_data)
+
+
+def per_row_table(stats):
+    lines = [stats.DATA.format(*row) for row in stats.service.course_table(0)]
+    print(*lines, sep='\n')
+
+
+def per_row_list(tracker):
+    print(*tracker.service.students(), sep='\n')
+
+
+def measure(call, *args) -> (float, int):
+    """Return seconds and peak traced bytes of a call printing to a file"""
+    with tempfile.TemporaryFile('w') as file, redirect_stdout(file):
+        start = time.perf_counter()
+        call(*args)
+        file.flush()
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            call(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else STUDENTS
+    tracker = build(n)
+    stats = Stats(tracker.service.view())
+    print(f'{n:,} rows{"seconds":>14}{"peak MiB":>12}')
+    for name, call, arg in (
+            ('table per row', per_row_table, stats),
+            ('table render', stats.print_course, 0),
+            ('list per row', per_row_list, tracker),
+            ('list render', tracker.do_list, '')):
+        seconds, peak = measure(call, arg)
+        print(f'{name:<18}{seconds:>14.3f}{peak / 2 ** 20:>12.1f}')
@@ -0,0 +1,173 @@
+"""Throughput and latency of every tracker command by store and scale
+
+Run from the task directory:
+    python -m bench.suite [--stores dict ...] [--scales 1000 ...] [--output FILE]
+    python -m bench.suite --compare OLD NEW
+
+Every run builds a roster of the given number of students from a
+seeded generator, so runs are reproducible, and drives a Tracker
+through batch.Batch line by line, timing every command:
+* add students - one line per student in 'add students',
+* add points - one line per student in 'add points', to random ids,
+* find - up to FIND_LINES lines in 'find',
+* list, notify - the command,
+* statistics intro - entering 'statistics', which computes the summary,
+* course table, course top, course page - a full table,
+  'top 10' and 'page 5' of every course.
+
+Results are JSON lines, one per store, scale and operation, with the
+commit they were measured at. --compare prints how the seconds per
+command of a second results file relate to those of a first one.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from array import array
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from batch import Batch
+from bench.memory import roster
+from constants import COURSE_NAMES
+from store import STORES
+from tracker import Tracker
+
+SCALES = (10 ** 3, 10 ** 4, 10 ** 5)
+FIND_LINES = 10 ** 4
+REPEAT = 5  # Runs of commands timed once per run
+
+
+class Sink(io.TextIOBase):
+    """Text writer counting and dropping what it is given"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+        return len(text)
+
+
+def roster_lines(n, seed=0):
+    for creds in roster(n, seed):
+        yield f"{creds['first name']} {creds['last name']} {creds['email']}"
+
+
+def points_lines(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield '{} {} {} {} {}'.format(
+            rng.randint(1, n), *(rng.choice((0, rng.randint(1, 300))) for _ in range(4)))
+
+
+class Run:
+    def __init__(self, store, scale):
+        self.store = store
+        self.scale = scale
+        self.sink = Sink()
+        self.batch = Batch(Tracker(STORES[store]()))
+        self.results = []
+        with redirect_stdout(self.sink):
+            self.batch.enter(self.batch.shell)
+
+    def measure(self, operation, lines, setup=(), teardown=(), repeat=1):
+        """Time every line of lines, after running setup
+        and before running teardown, repeat times"""
+        latencies = array('d')
+        output = 0
+        step, clock = self.batch.step, time.perf_counter
+        with redirect_stdout(self.sink):
+            for _ in range(repeat):
+                for line in setup:
+                    step(line)
+                size = self.sink.size
+                for line in lines:
+                    start = clock()
+                    step(line)
+                    latencies.append(clock() - start)
+                output += self.sink.size - size
+                for line in teardown:
+                    step(line)
+
+        seconds = np.frombuffer(latencies)
+        p50, p95, p99 = np.percentile(seconds, (50, 95, 99)).tolist()
+        total = float(seconds.sum())
+        self.results.append({
+            'store': self.store, 'scale': self.scale, 'operation': operation,
+            'commands': len(seconds), 'seconds': total,
+            'commands per second': len(seconds) / total if total else None,
+            'p50': p50, 'p95': p95, 'p99': p99, 'output characters': output})
+
+    def run(self) -> [dict, ...]:
+        n = self.scale
+        courses = [name.lower() for name in COURSE_NAMES]
+        self.measure('add students', roster_lines(n), ['add students'], ['back'])
+        self.measure('add points', points_lines(n), ['add points'], ['back'])
+        self.measure('find', [str(i) for i in random.Random(1).choices(
+            range(1, n + 1), k=min(n, FIND_LINES))], ['find'], ['back'])
+        self.measure('list', ['list'], repeat=REPEAT)
+        self.measure('statistics intro', ['statistics'], teardown=['back'],
+                     repeat=REPEAT)
+        for operation, arg in (('course table', ''), ('course top', ' top 10'),
+                               ('course page', ' page 5')):
+            self.measure(operation, [course + arg for course in courses],
+                         ['statistics'], ['back'], repeat=REPEAT)
+        self.measure('notify', ['notify'])
+        with redirect_stdout(self.sink):
+            self.batch.step('exit')
+        return self.results
+
+
+def version() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version()}
+
+
+def compare(old_path, new_path):
+    """Print seconds per command of new results relative to old ones"""
+    def load(path):
+        with open(path) as file:
+            rows = [json.loads(line) for line in file]
+        return {(row['store'], row['scale'], row['operation']): row for row in rows}
+
+    old, new = load(old_path), load(new_path)
+    print(f'{"store":<10}{"scale":>10}  {"operation":<18}{"old":>12}{"new":>12}{"ratio":>8}')
+    for key in sorted(old.keys() & new.keys()):
+        before, after = (rows[key]['seconds'] / rows[key]['commands']
+                         for rows in (old, new))
+        ratio = after / before if before else float('nan')
+        print(f'{key[0]:<10}{key[1]:>10,}  {key[2]:<18}'
+              f'{before:>12.2e}{after:>12.2e}{ratio:>8.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stores', nargs='+', choices=STORES, default=list(STORES))
+    parser.add_argument('--scales', nargs='+', type=int, default=SCALES)
+    parser.add_argument('--output', metavar='FILE', help='instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    meta = version()
+    try:
+        for scale in args.scales:
+            for store in args.stores:
+                for result in Run(store, scale).run():
+                    print(json.dumps(meta | result), file=output, flush=True)
+    finally:
+        if args.output:
+            output.close()
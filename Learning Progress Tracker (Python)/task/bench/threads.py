@@ -0,0 +1,59 @@
+"""Points updates per second by writer threads sharing a ShardedStore
+
+Run from the task directory: python -m bench.threads [THREADS ...]
+
+Every thread adds UPDATES random points rows to random students.
+Each run checks that no update was lost. Scaling past one thread
+needs a free-threaded Python build; with the GIL, the numbers show
+the cost of the locks instead.
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bench.memory import roster
+from store import ShardedStore
+
+STUDENTS = 10 ** 5
+UPDATES = 10 ** 5
+THREADS = (1, 2, 4, 8)
+
+
+def run(threads) -> float:
+    """Return updates per second with that many writer threads"""
+    store = ShardedStore()
+    store.add_students(roster(STUDENTS))
+    rng = np.random.default_rng(0)
+    workloads = [(rng.integers(1, STUDENTS + 1, UPDATES).tolist(),
+                  rng.integers(0, 10, (UPDATES, 4)).tolist())
+                 for _ in range(threads)]
+
+    def write(student_ids, points):
+        for student_id, row in zip(student_ids, points):
+            store.add_points(student_id, row)
+
+    workers = [threading.Thread(target=write, args=workload)
+               for workload in workloads]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+
+    expected = sum(np.sum(points, axis=0) for _, points in workloads)
+    if store.totals['points'] != expected.tolist() or not store.check_totals():
+        raise AssertionError('updates were lost')
+    return threads * UPDATES / seconds
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or THREADS
+    base = None
+    print(f'{"threads":>8}{"updates/s":>14}{"scaling":>10}')
+    for threads in counts:
+        rate = run(threads)
+        base = base or rate
+        print(f'{threads:>8}{rate:>14,.0f}{rate / base:>10.2f}')
@@ -0,0 +1,33 @@
+class CourseBits:
+    """A bit per student and course, stored as one byte per student row
+
+    Rows are students in insertion order, so a student's byte is found
+    in O(1) and the whole set costs a byte per student.
+    """
+
+    def __init__(self, data=b''):
+        self.bits = bytearray(data)
+
+    def __contains__(self, row_course):
+        row, course = row_course
+        return row < len(self.bits) and bool(self.bits[row] >> course & 1)
+
+    def __iter__(self):
+        """Yield (row, course) of set bits in order"""
+        for row, byte in enumerate(self.bits):
+            course = 0
+            while byte:
+                if byte & 1:
+                    yield row, course
+                byte >>= 1
+                course += 1
+
+    def test_and_set(self, row, course) -> bool:
+        """Set a bit, return False if it already was set"""
+        if row >= len(self.bits):
+            self.bits.extend(bytes(max(row + 1 - len(self.bits), len(self.bits))))
+        mask = 1 << course
+        if self.bits[row] & mask:
+            return False
+        self.bits[row] |= mask
+        return True
@@ -1,3 +1,5 @@
-MAX_HASH = 10 ** 6
+FIRST_ID = 1
 COURSE_NAMES = ['Python', 'DSA', 'Databases', 'Flask']
 COMPLETE_POINTS = [600, 400, 480, 550]
+PAGE_SIZE = 20
+MAX_POINTS = 2 ** 63 - 1  # Of a student in a course, so that they fit in int64
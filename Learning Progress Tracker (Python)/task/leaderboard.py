@@ -0,0 +1,167 @@
+from bisect import bisect_left, insort
+from itertools import chain, islice
+
+
+class Leaderboard:
+    """Students enrolled in a course, sorted by points descending, then id
+
+    Entries are (-points, student_id) keys kept in a list of sorted
+    buckets of at most 2 * LOAD keys each. Finding a key is a bisect
+    over bucket maxima and then within one bucket, and moving a key
+    only shifts one small bucket, so a points update stays cheap
+    however many students are enrolled.
+
+    Ranks are answered with a Fenwick tree over bucket sizes. It is
+    updated in O(log n) when a bucket changes size and rebuilt lazily
+    when buckets are split or dropped.
+
+    A snapshot shares all buckets with the leaderboard it was taken
+    from, which copies a shared bucket before it first changes it,
+    so taking one costs a list of bucket references and later updates
+    copy at most one small bucket each.
+    """
+    LOAD = 512
+
+    def __init__(self):
+        self.buckets = []
+        self.maxes = []
+        self.size = 0
+        self.fenwick = None
+        self.owned = []  # Whether each bucket is shared with no snapshot
+
+    @classmethod
+    def from_sorted(cls, keys):
+        """Build a leaderboard from (-points, student_id) keys in order"""
+        leaderboard = cls()
+        leaderboard.buckets = [keys[i:i + cls.LOAD]
+                               for i in range(0, len(keys), cls.LOAD)]
+        leaderboard.maxes = [bucket[-1] for bucket in leaderboard.buckets]
+        leaderboard.size = len(keys)
+        leaderboard.owned = [True] * len(leaderboard.buckets)
+        return leaderboard
+
+    def snapshot(self) -> 'Leaderboard':
+        """Return a copy frozen as the leaderboard is now"""
+        snapshot = Leaderboard()
+        snapshot.buckets = list(self.buckets)
+        snapshot.maxes = list(self.maxes)
+        snapshot.size = self.size
+        snapshot.owned = [False] * len(self.buckets)
+        self.owned = [False] * len(self.buckets)
+        return snapshot
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """Yield (student_id, points) in leaderboard order"""
+        for negative_points, student_id in chain.from_iterable(self.buckets):
+            yield student_id, -negative_points
+
+    def slice(self, start=0, stop=None):
+        """Yield (student_id, points) from position start to stop,
+        skipping whole buckets before start"""
+        stop = self.size if stop is None else min(stop, self.size)
+        i = 0
+        while i < len(self.buckets) and start >= len(self.buckets[i]):
+            start -= len(self.buckets[i])
+            stop -= len(self.buckets[i])
+            i += 1
+        keys = chain.from_iterable(islice(self.buckets, i, None))
+        for negative_points, student_id in islice(keys, start, max(stop, start)):
+            yield student_id, -negative_points
+
+    def update(self, student_id, old_points, new_points):
+        """Move a student from old_points to new_points,
+        0 points meaning not enrolled"""
+        if old_points:
+            self.remove((-old_points, student_id))
+        if new_points:
+            self.insert((-new_points, student_id))
+
+    def insert(self, key):
+        self.size += 1
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            self.owned.append(True)
+            return
+
+        i = min(bisect_left(self.maxes, key), len(self.buckets) - 1)
+        bucket = self.own(i)
+        insort(bucket, key)
+        self.maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            self.buckets[i:i + 1] = bucket[:self.LOAD], bucket[self.LOAD:]
+            self.maxes[i:i + 1] = bucket[self.LOAD - 1], bucket[-1]
+            self.owned[i:i + 1] = True, True
+            self.fenwick = None
+        else:
+            self.fenwick_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        bucket = self.own(i)
+        del bucket[bisect_left(bucket, key)]
+        self.size -= 1
+        if bucket:
+            self.maxes[i] = bucket[-1]
+            self.fenwick_add(i, -1)
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+            del self.owned[i]
+            self.fenwick = None
+
+    def own(self, i) -> list:
+        """Return bucket i, copied first if a snapshot shares it"""
+        if not self.owned[i]:
+            self.buckets[i] = list(self.buckets[i])
+            self.owned[i] = True
+        return self.buckets[i]
+
+    def rank(self, student_id, points) -> int | None:
+        """Return 1-based position of a student with given points,
+        or None if there is no such entry"""
+        key = (-points, student_id)
+        i = bisect_left(self.maxes, key)
+        if i == len(self.buckets):
+            return None
+        bucket = self.buckets[i]
+        position = bisect_left(bucket, key)
+        if bucket[position] != key:
+            return None
+        return self.fenwick_prefix(i) + position + 1
+
+    def position(self, key) -> int:
+        """Return number of keys before key, whether it is present or not"""
+        i = bisect_left(self.maxes, key)
+        if i == len(self.buckets):
+            return self.size
+        return self.fenwick_prefix(i) + bisect_left(self.buckets[i], key)
+
+    def fenwick_build(self):
+        self.fenwick = [0] * (len(self.buckets) + 1)
+        for i, bucket in enumerate(self.buckets, start=1):
+            self.fenwick[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(self.fenwick):
+                self.fenwick[parent] += self.fenwick[i]
+
+    def fenwick_add(self, i, delta):
+        if self.fenwick is None:
+            return
+        i += 1
+        while i < len(self.fenwick):
+            self.fenwick[i] += delta
+            i += i & -i
+
+    def fenwick_prefix(self, i) -> int:
+        """Return number of keys in buckets before bucket i"""
+        if self.fenwick is None:
+            self.fenwick_build()
+        total = 0
+        while i > 0:
+            total += self.fenwick[i]
+            i -= i & -i
+        return total
@@ -1,19 +1,104 @@
 """Learning Progress Tracker
 
+Run with `--store columnar` to keep points and submissions
+in NumPy arrays instead of a dict of dicts, see store.py.
 
-Example student_data dict with one student inside:
-{
-    752001:
-        {
-            'email': 'c@d.e',
-            'first name': 'Aa',
-            'last name': 'Bb',
-            'points': [0, 1, 2, 3],
-            'submissions': [0, 1, 1, 1]
-        },
-}
+Run with `--store sharded` for a store which threads can share.
+
+Run with `--store processes --workers <n>` to partition students over
+n worker processes.
+
+Run with `--store sqlite --database <path>` to keep everything in an
+SQLite database instead of memory. It needs no `--log`.
+
+Run with `--log <path>` to replay a write-ahead log on startup
+and keep appending to it, see wal.py.
+
+Run with `--snapshot <dir>` to start from a snapshot saved by
+`checkpoint to <dir>`, see snapshot.py. Add `--read-only` to open
+only statistics straight on the snapshot files.
+
+Run with `--script <file>` to run the commands in a file, or with
+`--batch` to run commands from stdin, without the overhead of an
+interactive session, see batch.py.
+
+Run with `--serve <port>` to serve many clients at once over TCP,
+each in a session of its own over the same students, see server.py.
+It does not take `--store processes`.
+
+Piped stdin is read in blocks rather than line by line, and
+data lines of 'add students' and 'add points' skip command dispatch,
+see reader.py.
+
+Run with `--metrics` to record latency histograms of every command,
+shown by the `metrics` command, see metrics.py.
+
+To embed the tracker in a program, use TrackerService from service.py.
 """
+import argparse
+import os
+import sys
+
+import batch
+import server
+import snapshot
+from base import Maim
+from metrics import Metrics
+from reader import BlockReader
+from service import TrackerService
+from store import STORES
+from subshells import Stats
 from tracker import Tracker
+from wal import DURABILITY
 
 if __name__ == "__main__":
-    Tracker().cmdloop()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', choices=STORES, default='dict')
+    parser.add_argument('--database', metavar='PATH', default=':memory:',
+                        help='database of the sqlite store')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes of the processes store')
+    parser.add_argument('--log', metavar='PATH')
+    parser.add_argument('--durability', choices=DURABILITY, default='batch')
+    parser.add_argument('--snapshot', metavar='DIR')
+    parser.add_argument('--read-only', action='store_true')
+    parser.add_argument('--script', metavar='FILE')
+    parser.add_argument('--batch', action='store_true',
+                        help='run commands from stdin in batch mode')
+    parser.add_argument('--metrics', action='store_true',
+                        help='record latency histograms of commands')
+    parser.add_argument('--serve', metavar='PORT', type=int)
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to serve on')
+    args = parser.parse_args()
+    if args.log and args.store == 'sqlite' and args.database != ':memory:':
+        # Its students would be added again on replay
+        parser.error('--log is for in-memory stores, '
+                     'a --database file keeps everything itself')
+    if args.serve is not None and args.store == 'processes' and not args.snapshot:
+        # Statistics sessions would see writes of other clients
+        parser.error('--serve needs a store with views, not --store processes')
+    if args.metrics:
+        Maim.metrics = Metrics()
+    if args.snapshot and args.read_only:
+        shell = Stats(TrackerService(snapshot.load(args.snapshot, read_only=True)))
+    elif args.snapshot:
+        shell = Tracker(snapshot.load(args.snapshot))
+    else:
+        store_args = {'sqlite': (args.database,),
+                      'processes': (args.workers,)}.get(args.store, ())
+        shell = Tracker(STORES[args.store](*store_args))
+    if args.log and not args.read_only:
+        shell.service.open_log(args.log, args.durability)
+    # Only a real stream, not one swapped in by a program running this
+    isatty = getattr(sys.stdin, 'isatty', None)
+    buffer = getattr(sys.stdin, 'buffer', None)
+    if isatty is not None and buffer is not None and not isatty():
+        sys.stdin = BlockReader(buffer, getattr(sys.stdin, 'encoding', 'utf-8'),
+                                getattr(sys.stdin, 'errors', 'strict'))
+    if args.serve is not None:
+        server.run(shell.service, args.host, args.serve)
+    elif args.script or args.batch:
+        batch.run(shell, args.script)
+    else:
+        shell.cmdloop()
@@ -0,0 +1,96 @@
+"""Memory accounting of the tracker
+
+Stores break their memory down by component with Store.memory, sized
+here by deep_size. It follows references from the given objects and
+counts every object once, even if several components share it, so
+components add up to the memory of the store, with each shared object
+counted in the first component that reaches it.
+
+traced records which lines of code allocated memory still held after
+a block, like a bulk import, using tracemalloc snapshots.
+"""
+import contextlib
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+CONTAINERS = (list, tuple, set, frozenset)
+
+
+def deep_size(*objects, seen=None) -> int:
+    """Return bytes of objects and everything they reference,
+    skipping objects whose ids are in seen and adding the rest to it"""
+    seen = set() if seen is None else seen
+    size = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, np.ndarray):
+            if not obj.flags.owndata:
+                size += obj.nbytes
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, CONTAINERS):
+            stack.extend(obj)
+        elif hasattr(obj, '__slots__'):
+            stack.extend(getattr(obj, name) for name in obj.__slots__
+                         if hasattr(obj, name))
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+            stack.append(vars(obj))
+    return size
+
+
+def resident_bytes() -> int | None:
+    """Return resident memory of this process, None if unknown"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def report(components: dict, students: int) -> str:
+    per_student = max(students, 1)
+    lines = [f'{"component":<22}{"bytes":>16}{"bytes/student":>16}']
+    for name, size in (*components.items(), ('total', sum(components.values()))):
+        lines.append(f'{name:<22}{size:>16,}{size / per_student:>16.1f}')
+    resident = resident_bytes()
+    if resident is not None:
+        lines.append(f'{"process resident":<22}{resident:>16,}')
+    return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def traced(limit=10):
+    """Yield a list, filled on exit with tracemalloc.StatisticDiff of the
+    limit lines whose allocations grew most during the block"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),
+              tracemalloc.Filter(False, __file__))
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    growth = []
+    try:
+        yield growth
+    finally:
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        if started:
+            tracemalloc.stop()
+        growth.extend(after.compare_to(before, 'lineno')[:limit])
+
+
+def growth_report(growth) -> str:
+    lines = ['Memory grown by line:']
+    for stat in growth:
+        frame = stat.traceback[0]
+        lines.append(f'{os.path.basename(frame.filename)}:{frame.lineno}: '
+                     f'{stat.size_diff:+,} bytes in {stat.count_diff:+,} blocks')
+    return '\n'.join(lines)
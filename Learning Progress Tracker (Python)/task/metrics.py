@@ -0,0 +1,106 @@
+"""Per-command call counts, latency histograms and output sizes
+
+Commands are named by shell class and handler, like 'Tracker.add',
+'AddPoints.default' or 'Stats.python'. Latencies go to log-linear
+buckets, BUCKETS_PER_OCTAVE per doubling from MIN_SECONDS up, so
+recording one is O(1) and percentiles are exact to a bucket, about 19%.
+
+Shells record commands only while Maim.metrics is set, otherwise
+skipping it costs them one attribute check per command. A command
+entering a subshell through cmdloop is timed until the subshell returns.
+"""
+import io
+import json
+import math
+import sys
+import time
+from contextlib import redirect_stdout
+
+MIN_SECONDS = 1e-7
+BUCKETS_PER_OCTAVE = 4
+BUCKETS = 30 * BUCKETS_PER_OCTAVE  # Up to about 100 s
+
+
+def bucket_bounds() -> [float, ...]:
+    """Return the lower bound of every bucket"""
+    return [MIN_SECONDS * 2 ** (i / BUCKETS_PER_OCTAVE) for i in range(BUCKETS)]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.seconds = 0.0
+        self.output = 0
+
+    def add(self, seconds, output):
+        self.count += 1
+        self.seconds += seconds
+        self.output += output
+        if seconds > MIN_SECONDS:
+            i = min(int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_OCTAVE),
+                    BUCKETS - 1)
+        else:
+            i = 0
+        self.counts[i] += 1
+
+    def percentile(self, p) -> float:
+        """Return the upper bound of the bucket holding percentile p"""
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return MIN_SECONDS * 2 ** ((i + 1) / BUCKETS_PER_OCTAVE)
+        return math.inf
+
+
+class CountingWriter(io.TextIOBase):
+    """Text writer passing everything on to target,
+    counting the UTF-8 bytes of it"""
+
+    def __init__(self, target):
+        self.target = target
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text.encode())
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+
+    def time(self, shell, name, call, *args):
+        """Call a handler of a shell and record it as command name"""
+        writer = CountingWriter(sys.stdout)
+        start = time.perf_counter()
+        try:
+            with redirect_stdout(writer):
+                return call(*args)
+        finally:
+            key = f'{type(shell).__name__}.{name}'
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].add(time.perf_counter() - start, writer.size)
+
+    def report(self) -> str:
+        lines = [f'{"command":<24}{"count":>9}{"p50 us":>11}{"p95 us":>11}'
+                 f'{"p99 us":>11}{"output bytes":>14}']
+        for key, histogram in sorted(self.histograms.items()):
+            p50, p95, p99 = (histogram.percentile(p) * 1e6 for p in (50, 95, 99))
+            lines.append(f'{key:<24}{histogram.count:>9}{p50:>11.1f}'
+                         f'{p95:>11.1f}{p99:>11.1f}{histogram.output:>14}')
+        return '\n'.join(lines)
+
+    def export(self, path):
+        """Write raw histograms to a JSON file"""
+        with open(path, 'w') as file:
+            json.dump({'bucket lower bounds': bucket_bounds(),
+                       'commands': {key: vars(histogram) for key, histogram
+                                    in sorted(self.histograms.items())}},
+                      file)
@@ -1,5 +1,9 @@
 import re
 
+import numpy as np
+
+from constants import MAX_POINTS
+
 
 def parse_points(line: str) -> tuple | None:
     """Parse user-provided points
@@ -10,9 +14,9 @@ def parse_points(line: str) -> tuple | None:
     * and remaining 4 values are ints
     """
     line = line.split()
-    student_id, *points = line
-    if len(points) != 4:
+    if len(line) != 5:
         return None
+    student_id, *points = line
 
     try:
         points = [int(p) for p in points]
@@ -20,7 +24,7 @@ def parse_points(line: str) -> tuple | None:
         return None
 
     for p in points:
-        if p < 0:
+        if not 0 <= p <= MAX_POINTS:
             return None
 
     try:
@@ -31,6 +35,55 @@ def parse_points(line: str) -> tuple | None:
     return student_id, *points
 
 
+def parse_points_chunk(lines: [str, ...]
+                       ) -> (np.ndarray, np.ndarray, [tuple, ...], int):
+    """Parse a chunk of user-provided points lines at once
+
+    Return a tuple of:
+    * an array of student ids and an array of their points, one row
+    per line made of plain decimal numbers that fit in int64,
+    * a list of parse_points results for other correct lines,
+    * the number of incorrect lines.
+    """
+    rows = [line.split() for line in lines]
+    rows = [row for row in rows if len(row) == 5]
+    incorrect = len(lines) - len(rows)
+    if not rows:
+        return (np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.int64),
+                [], incorrect)
+
+    table = np.array(rows, dtype=str)
+    fast = (np.char.isdecimal(table).all(axis=1)
+            & (np.char.str_len(table).max(axis=1) <= 18))
+    values = table[fast].astype(np.int64)
+
+    slow = []
+    for row in table[~fast].tolist():
+        points = parse_points(' '.join(row))
+        if points is None:
+            incorrect += 1
+        else:
+            slow.append(points)
+
+    return values[:, 0], values[:, 1:], slow, incorrect
+
+
+CREDS = re.compile(r'(\S+) (.+) (\S+)')
+FIRST_NAME = re.compile("""
+        (?!.*[-']{2})  # No doubles allowed
+        (?![-'])  # Not allowed at the beginning
+        ([A-Za-z-']{2,})  # First name
+        (?<![-'])  # Not allowed at the end
+        """, flags=re.VERBOSE)
+LAST_NAME = re.compile("""
+        (?!.*[-']{2})  # No doubles allowed
+        (?![-'])  # Not allowed at the beginning
+        ([A-Za-z-' ]{2,})  # Last name
+        (?<![-'])  # Not allowed at the end
+        """, flags=re.VERBOSE)
+EMAIL = re.compile(r"[-.\w]+@[-.\w]+\.[-.\w]+")
+
+
 def parse_creds(line: str) -> dict | None:
     """Parse user-provided credentials
 
@@ -39,28 +92,36 @@ def parse_creds(line: str) -> dict | None:
 
     Return None if any credentials are missing.
     """
-    match = re.match(r'(\S+) (.+) (\S+)', line)
+    return check_creds(split_creds(line))
+
+
+def split_creds(line: str) -> dict | None:
+    """Split user-provided credentials into a dict without checking them,
+    or return None if any credentials are missing"""
+    match = CREDS.match(line)
     if not match:
         return None
+    return dict(zip(('first name', 'last name', 'email'), match.groups()))
+
+
+def check_creds(creds: dict | None) -> dict | None:
+    """Return a copy of credentials with invalid ones replaced by None"""
+    if creds is None:
+        return None
+    first_name = FIRST_NAME.fullmatch(creds['first name'])
+    last_name = LAST_NAME.fullmatch(creds['last name'])
+    email = EMAIL.fullmatch(creds['email'])
+    return {'first name': first_name and first_name.group(),
+            'last name': last_name and last_name.group(),
+            'email': email and email.group()}
+
 
-    first_name, last_name, email = match.groups()
-    first_name = re.fullmatch("""
-            (?!.*[-']{2})  # No doubles allowed
-            (?![-'])  # Not allowed at the beginning
-            ([A-Za-z-']{2,})  # First name
-            (?<![-'])  # Not allowed at the end
-            """, first_name, flags=re.VERBOSE)
-    first_name = first_name and first_name.group()
-
-    last_name = re.fullmatch("""
-            (?!.*[-']{2})  # No doubles allowed
-            (?![-'])  # Not allowed at the beginning
-            ([A-Za-z-' ]{2,})  # Last name
-            (?<![-'])  # Not allowed at the end
-            """, last_name, flags=re.VERBOSE)
-    last_name = last_name and last_name.group()
-
-    email = re.fullmatch(r"[-.\w]+@[-.\w]+\.[-.\w]+", email)
-    email = email and email.group()
-
-    return {'first name': first_name, 'last name': last_name, 'email': email}
+def creds_error(creds: dict | None) -> str | None:
+    """Return feedback for credentials parsed by parse_creds,
+    or None if they are all correct"""
+    if creds is None:
+        return 'Incorrect credentials'
+    for key, cred in creds.items():
+        if cred is None:
+            return f'Incorrect {key}.'
+    return None
@@ -0,0 +1,83 @@
+"""Block reader of piped stdin
+
+When stdin is a pipe or a file rather than a terminal, main.py puts
+a BlockReader over its binary buffer in place of sys.stdin. It reads
+whatever is available, up to BLOCK_SIZE bytes, cuts it after the last
+newline and decodes all of its whole lines at once, so a line costs
+a split instead of a readline and a decode of its own.
+
+input(), readline and iteration work on it as on sys.stdin, with
+universal newlines. Subshells adding students or points take lines
+from lines() instead, see Subshell.cmdloop.
+"""
+import sys
+
+
+class BlockReader:
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, binary, encoding='utf-8', errors='strict'):
+        self.binary = binary
+        self.encoding = encoding
+        self.errors = errors
+        self.pending = []  # Decoded lines of the last block, without newlines
+        self.position = 0  # Of the next line in pending
+        self.rest = b''  # Bytes read past the last newline
+        self.newline = True  # Whether the last line of pending had one
+        self.ended = False
+
+    def fill(self) -> bool:
+        """Read and decode the next block of lines into pending,
+        return False at the end of input"""
+        if self.ended:
+            return False
+        while True:
+            sys.stdout.flush()  # Answers to the lines so far go out first
+            block = self.binary.read1(self.BLOCK_SIZE)
+            if not block:
+                self.ended = True
+                data, self.rest = self.rest, b''
+                if not data:
+                    return False
+                break
+            end = block.rfind(b'\n') + 1
+            if end:
+                data, self.rest = self.rest + block[:end], block[end:]
+                break
+            self.rest += block
+
+        text = data.decode(self.encoding, self.errors)
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        self.pending = text.split('\n')
+        last = self.pending.pop()
+        if last:
+            self.pending.append(last)
+            self.newline = False
+        self.position = 0
+        return True
+
+    def lines(self):
+        """Yield lines without newlines, each read once it is yielded"""
+        while self.position < len(self.pending) or self.fill():
+            line = self.pending[self.position]
+            self.position += 1
+            yield line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.position == len(self.pending) and not self.fill():
+            raise StopIteration
+        line = self.pending[self.position]
+        self.position += 1
+        if self.newline or self.position < len(self.pending):
+            return line + '\n'
+        return line
+
+    def readline(self) -> str:
+        return next(self, '')
+
+    def isatty(self):
+        return False
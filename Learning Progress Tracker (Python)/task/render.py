@@ -0,0 +1,65 @@
+"""Fast rendering of long tables to stdout
+
+Rows are formatted CHUNK_ROWS at a time: a chunk of course rows is laid
+out as one flat list of column values and formatted by a single
+printf-style call of COURSE_ROW repeated once per row, instead of one
+str.format call per row. Chunks are written as soon as they are
+formatted, so memory use does not grow with the length of a table.
+
+Text of a table ends in a newline, so it is what print(*lines, sep='\\n')
+would print, a lone newline for no rows.
+"""
+import itertools
+import sys
+from collections.abc import Iterable
+
+CHUNK_ROWS = 10_000
+COURSE_ROW = '%-7d%-10d%-9s\n'  # Stats.DATA, with completed preformatted
+PERCENT = '%.1f%%'  # Same text as '{:.1%}'
+
+
+def chunks(values: Iterable, size=CHUNK_ROWS) -> Iterable[list]:
+    """Yield lists of the next size values"""
+    values = iter(values)
+    while chunk := list(itertools.islice(values, size)):
+        yield chunk
+
+
+def course_rows(rows: Iterable[tuple[int, int, float]], size=CHUNK_ROWS
+                ) -> Iterable[str]:
+    """Yield text of (id, points, completed) rows, size rows at a time"""
+    empty = True
+    for chunk in chunks(rows, size):
+        # Not zip(*chunk), which makes an iterator per row for gc to track
+        flat = list(itertools.chain.from_iterable(chunk))
+        flat[2::3] = [PERCENT % (share * 100) for share in flat[2::3]]
+        empty = False
+        yield COURSE_ROW * len(chunk) % tuple(flat)
+    if empty:
+        yield '\n'
+
+
+def lines(values: Iterable, size=CHUNK_ROWS) -> Iterable[str]:
+    """Yield text of values, one per line, size lines at a time"""
+    empty = True
+    for chunk in chunks(values, size):
+        empty = False
+        yield '\n'.join(map(str, chunk)) + '\n'
+    if empty:
+        yield '\n'
+
+
+def write(texts: Iterable[str]):
+    """Write texts to stdout, encoded straight to its binary buffer
+    if it has one, as that of a real file or terminal does"""
+    stdout = sys.stdout
+    buffer = getattr(stdout, 'buffer', None)
+    if buffer is None:
+        for text in texts:
+            stdout.write(text)
+        return
+    stdout.flush()  # Text written before goes first
+    encoding, errors = stdout.encoding, stdout.errors
+    for text in texts:
+        buffer.write(text.encode(encoding, errors))
+    buffer.flush()
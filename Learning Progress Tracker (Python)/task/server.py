@@ -0,0 +1,149 @@
+"""Server mode: many clients sharing one tracker over TCP
+
+Every connection gets a Session of its own, with its own subshell
+stack, run by batch.Batch one line at a time. All sessions share one
+TrackerService, so they see each other's students and points.
+Commands run whole on the event loop, so they never interleave.
+
+Clients may pipeline commands: lines are answered in the order they
+were sent, each with exactly the output of an interactive session.
+Course tables longer than STREAM_ROWS rows are streamed a chunk at a
+time, letting other clients in between chunks. Statistics sessions
+read a view of the store, so chunks never mix old and new points.
+
+A session differs from an interactive tracker in that:
+* 'exit' closes the connection, but not the store,
+* 'add ... from <path>', 'checkpoint to <dir>' and 'metrics to <path>'
+  are not available, as they would touch files of the server or block
+  on its stdin.
+"""
+import asyncio
+import io
+from contextlib import redirect_stdout
+
+from batch import Batch
+from service import TrackerService
+from subshells import Stats
+from tracker import Tracker
+
+STREAM_ROWS = 1000  # Course table rows formatted and sent at once
+
+
+class StreamingStats(Stats):
+    def __init__(self, service: TrackerService, streams: list):
+        super().__init__(service)
+        self.streams = streams
+
+    def print_course(self, course_id, start=0, stop=None):
+        """Print course details, or leave the rows to be streamed
+        if there may be more than STREAM_ROWS of them"""
+        if stop is not None and stop - start <= STREAM_ROWS:
+            super().print_course(course_id, start, stop)
+            return
+        print(self.course_intro(course_id))
+        self.streams.append(
+            self.formatted_stats(course_id, start, stop, STREAM_ROWS))
+
+
+class Session(Tracker):
+    """Tracker of one connection"""
+
+    def __init__(self, service: TrackerService):
+        super().__init__(service.student_data)
+        self.service = service
+        self.streams = []  # Output left to stream after the command
+
+    def do_add(self, arg):
+        match arg.split(maxsplit=2):
+            case [_, 'from', _]:
+                self.default(arg)
+            case _:
+                super().do_add(arg)
+
+    def do_checkpoint(self, arg):
+        self.default(arg)
+
+    def do_metrics(self, arg):
+        match arg.split(maxsplit=1):
+            case ['to', _]:
+                self.default(arg)
+            case _:
+                super().do_metrics(arg)
+
+    def do_statistics(self, arg):
+        match arg:
+            case '':
+                self.enter(StreamingStats(self.service.view(), self.streams))
+            case _:
+                self.default(arg)
+
+    def do_exit(self, arg):
+        match arg:
+            case '':
+                print('Bye!')
+                return True
+            case _:
+                self.default(arg)
+
+
+class Server:
+    def __init__(self, service: TrackerService):
+        self.service = service
+        self.sessions = 0
+        self.commands = 0
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """Run a session with a client until it exits or disconnects"""
+        session = Session(self.service)
+        batch = Batch(session)
+        self.sessions += 1
+        try:
+            with redirect_stdout(io.StringIO()) as output:
+                batch.enter(session)
+            writer.write(output.getvalue().encode())
+            async for line in reader:
+                with redirect_stdout(io.StringIO()) as output:
+                    stopped = batch.step(line.decode(errors='replace').rstrip('\r\n'))
+                writer.write(output.getvalue().encode())
+                await self.flush_streams(session, writer)
+                await writer.drain()
+                self.commands += 1
+                if stopped:
+                    break
+                await asyncio.sleep(0)  # Let other clients in between commands
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    @staticmethod
+    async def flush_streams(session: Session, writer: asyncio.StreamWriter):
+        for stream in session.streams:
+            for chunk in stream:
+                writer.write(chunk.encode())
+                await writer.drain()
+                await asyncio.sleep(0)
+        session.streams.clear()
+
+    async def serve(self, host='127.0.0.1', port=0) -> asyncio.Server:
+        """Start accepting clients, port 0 picks a free port"""
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def run(service: TrackerService, host, port):
+    """Serve clients until interrupted, then close the store"""
+    async def serve_forever():
+        server = await Server(service).serve(host, port)
+        for sock in server.sockets:
+            print('Serving on {}:{}'.format(*sock.getsockname()[:2]), flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
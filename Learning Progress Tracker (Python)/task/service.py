@@ -0,0 +1,234 @@
+"""Programmatic API of the tracker
+
+TrackerService does everything the shells do, but takes and returns
+Python values and NumPy arrays instead of text, so a program can embed
+the tracker without parsing its output. Tracker and the subshells are
+thin clients of it: they only parse lines and format results.
+
+Courses are indexes into COURSE_NAMES.
+"""
+import collections
+import copy
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from constants import COURSE_NAMES, MAX_POINTS
+from parse import check_creds, creds_error
+import snapshot
+from store import COURSES, DictStore, Store, group_by_student
+from wal import Log
+
+TAKEN = 'This email is already taken.'
+
+
+class TrackerService:
+    BATCH_SIZE = 10_000  # Students added to student_data at once
+
+    def __init__(self, student_data: Store = None):
+        self.student_data = student_data if student_data is not None else DictStore()
+
+    def __contains__(self, student_id) -> bool:
+        return student_id in self.student_data
+
+    def __len__(self) -> int:
+        return len(self.student_data)
+
+    def students(self) -> Iterable[int]:
+        """Return ids of all students in the order they were added"""
+        return iter(self.student_data)
+
+    def student(self, student_id) -> dict:
+        """Return credentials of a student"""
+        return self.student_data.student(student_id)
+
+    def view(self) -> 'TrackerService':
+        """Return a service reading a view of the students as they are now,
+        unaffected by later writes"""
+        return TrackerService(self.student_data.view())
+
+    def student_error(self, creds: dict | None) -> str | None:
+        """Return why a student cannot be added, or None if they can"""
+        error = creds_error(check_creds(creds))
+        if error is None and self.student_data.email_taken(creds['email']):
+            error = TAKEN
+        return error
+
+    def add_student(self, creds: dict | None) -> int:
+        """Add a student and return their id
+
+        Raise ValueError with feedback for the user
+        if credentials are incorrect or the email is taken.
+        """
+        with self.student_data.adding():
+            error = self.student_error(creds)
+            if error is not None:
+                raise ValueError(error)
+            return self.student_data.add_student(check_creds(creds))
+
+    def add_students(self, students: Iterable[dict | None]
+                     ) -> ([int, ...], collections.Counter):
+        """Add students, skipping any add_student would reject
+
+        Return ids of added students and numbers of skipped students
+        by error.
+        """
+        with self.student_data.adding():
+            added = []
+            rejected = collections.Counter()
+            batch = {}
+            for creds in students:
+                creds = check_creds(creds)
+                error = creds_error(creds)
+                if error is None:
+                    email = creds['email']
+                    if email in batch or self.student_data.email_taken(email):
+                        error = TAKEN
+                    else:
+                        batch[email] = creds
+                if error is not None:
+                    rejected[error] += 1
+                if len(batch) == self.BATCH_SIZE:
+                    added += self.student_data.add_students(batch.values())
+                    batch.clear()
+            added += self.student_data.add_students(batch.values())
+            return added, rejected
+
+    def add_student_points(self, student_id, points: [int, ...]) -> bool:
+        """Add points of a submission to each course with non-zero points,
+        return False if there is no such student"""
+        if len(points) != COURSES or min(points) < 0 or max(points) > MAX_POINTS:
+            raise ValueError(f'points must be {COURSES} numbers '
+                             f'from 0 to {MAX_POINTS}')
+        if student_id not in self.student_data:
+            return False
+        self.student_data.add_points(student_id, list(points))
+        return True
+
+    def add_points(self, student_ids, points, submissions=None) -> np.ndarray:
+        """Add rows of points to students in bulk
+
+        Rows of the same student are summed. Submissions are rows of
+        submission counts, by default one per non-zero point.
+        Return a mask of rows whose student exists, other rows are skipped.
+        """
+        student_ids = np.asarray(student_ids, dtype=np.int64)
+        try:
+            points = np.asarray(points, dtype=np.int64).reshape(-1, COURSES)
+        except OverflowError:
+            raise ValueError(f'points must be at most {MAX_POINTS}') from None
+        if len(points) != len(student_ids) or (points < 0).any():
+            raise ValueError(f'points must be a row of {COURSES} '
+                             f'non-negative numbers per student id')
+        found = np.fromiter((i in self.student_data for i in student_ids.tolist()),
+                            dtype=bool, count=len(student_ids))
+        if submissions is not None:
+            submissions = np.asarray(submissions, dtype=np.int64)[found]
+        student_ids, points, submissions, _ = group_by_student(
+            student_ids[found], points[found], submissions)
+        self.student_data.add_points_bulk(student_ids.tolist(), points, submissions)
+        return found
+
+    def find(self, student_ids) -> [list[int] | None, ...]:
+        """Return points of students, None for ids of no student"""
+        return [self.student_data.points(student_id)
+                if student_id in self.student_data else None
+                for student_id in student_ids]
+
+    def course_table(self, course: int, limit=None, offset=0
+                     ) -> [(int, int, float), ...]:
+        """Return (id, points, completed) of students enrolled in course
+        sorted by points, then id, skipping offset students and
+        returning at most limit"""
+        stop = None if limit is None else offset + limit
+        with self.student_data.reading():
+            return self.student_data.course_stats(course, offset, stop)
+
+    def course_rows(self, course: int, limit=None, offset=0
+                    ) -> Iterator[tuple[int, int, float]]:
+        """Yield rows of course_table one at a time. They are read as
+        they are yielded, so iterate the rows of a view if points may
+        change in the meantime."""
+        stop = None if limit is None else offset + limit
+        return self.student_data.iter_course_stats(course, offset, stop)
+
+    def rank(self, student_id, course: int) -> tuple[int, int] | None:
+        """Return position of a student in a course and number of enrolled
+        students, or None if they are not enrolled"""
+        with self.student_data.reading():
+            return self.student_data.rank(student_id, course)
+
+    def summary(self) -> dict:
+        """Return names of the most and least popular, active and
+        easy courses, None where there is no such course"""
+        with self.student_data.reading():
+            totals = copy.deepcopy(self.student_data.totals)
+        submissions = totals['submissions']
+        average_points = [(p / s) if s != 0 else 0
+                          for p, s in zip(totals['points'], submissions)]
+
+        summary = {}
+        for most, least, metric in (
+                ('most popular', 'least popular', totals['enrolled']),
+                ('highest activity', 'lowest activity', submissions),
+                ('easiest course', 'hardest course', average_points)):
+            summary[most], summary[least] = self.get_most_and_least(metric)
+        return summary
+
+    @staticmethod
+    def get_most_and_least(metric) -> (str | None,) * 2:
+        """Return all the "most" courses, and the "least" course
+        if there is exactly one; according to the metric.
+
+        Return (None, None) if metric for all courses is 0.
+
+        Return (most, None) if there is wrong number of least courses,
+        as there can only be one least course.
+        """
+        if metric == [0] * 4:
+            return None, None
+
+        max_value, min_value = max(metric), min(metric)
+        most, least = [], []
+        for i, value in enumerate(metric):
+            if value == max_value:
+                most.append(COURSE_NAMES[i])
+            elif value == min_value:
+                least.append(COURSE_NAMES[i])
+
+        if len(least) != 1:
+            least = [None]
+
+        return ', '.join(most), least[0]
+
+    def pending_notifications(self) -> [(int, int), ...]:
+        """Return (student_id, course) of completions not notified yet,
+        and mark them as notified"""
+        with self.student_data.reading():
+            return [(student_id, course) for student_id, course
+                    in self.student_data.pending_completions()
+                    if self.student_data.mark_sent(student_id, course)]
+
+    def memory(self) -> dict:
+        """Return bytes used by each component of the store"""
+        return self.student_data.memory()
+
+    def checkpoint(self, directory):
+        """Save a snapshot of the whole state to directory
+        and truncate the log, whose records it now contains"""
+        snapshot.save(self.student_data, directory)
+        if self.student_data.log is not None:
+            self.student_data.log.truncate()
+
+    def open_log(self, path, durability='batch'):
+        """Replay a write-ahead log into the store
+        and append all further writes to it"""
+        log = Log(path, durability)
+        log.replay(self.student_data)
+        self.student_data.log = log
+
+    def commit(self):
+        self.student_data.commit()
+
+    def close(self):
+        self.student_data.close()
@@ -0,0 +1,203 @@
+"""Snapshots of tracker state
+
+A snapshot is a directory with:
+* meta.json - first id, number of students and running totals,
+* points.npy, submissions.npy - students x courses arrays,
+* a string table for each of first names, last names and emails:
+  <name>.bin holds the UTF-8 strings back to back
+  and <name>.npy holds their offsets into it,
+* sent.npy - bits of sent notifications, a byte per student.
+
+Ids are not stored: they are first_id plus the row of a student.
+
+Loading maps every file with np.memmap, so even a huge snapshot opens
+in milliseconds and pages are read from disk only when touched.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from bitset import CourseBits
+from constants import COMPLETE_POINTS, MAX_POINTS
+from store import ColumnarStore, Store
+
+STRING_COLUMNS = ('first names', 'last names', 'emails')
+
+
+class StringTable:
+    """Strings stored back to back in a bytes-like buffer, located by
+    offsets, followed by strings appended since"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self.appended = []
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.appended)
+
+    def __getitem__(self, i):
+        loaded = len(self.offsets) - 1
+        if i < loaded:
+            return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode()
+        return self.appended[i - loaded]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, string):
+        self.appended.append(string)
+
+    @staticmethod
+    def save(strings, path):
+        encoded = [string.encode() for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        np.save(path + '.npy', offsets)
+        with open(path + '.bin', 'wb') as file:
+            file.write(b''.join(encoded))
+
+    @classmethod
+    def load(cls, path):
+        offsets = np.load(path + '.npy', mmap_mode='r')
+        if offsets[-1]:
+            data = np.memmap(path + '.bin', dtype=np.uint8, mode='r')
+        else:  # An empty file cannot be mapped
+            data = b''
+        return cls(data, offsets)
+
+
+def file_name(directory, column):
+    return os.path.join(directory, column.replace(' ', '_'))
+
+
+def save(student_data: Store, directory):
+    """Write a snapshot of a store to directory,
+    replacing any previous snapshot there only once it is complete"""
+    temporary = directory.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    points, submissions, *strings = student_data.columns()
+    np.save(os.path.join(temporary, 'points.npy'), points)
+    np.save(os.path.join(temporary, 'submissions.npy'), submissions)
+    for column, values in zip(STRING_COLUMNS, strings):
+        StringTable.save(values, file_name(temporary, column))
+    np.save(os.path.join(temporary, 'sent.npy'),
+            np.frombuffer(student_data.sent_bits().bits, dtype=np.uint8))
+    with open(os.path.join(temporary, 'meta.json'), 'w') as file:
+        json.dump({'first id': student_data.first_id,
+                   'size': len(student_data),
+                   'totals': student_data.totals}, file)
+
+    previous = directory.rstrip(os.sep) + '.old'
+    if os.path.exists(directory):
+        os.replace(directory, previous)
+    os.replace(temporary, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def load(directory, read_only=False) -> ColumnarStore:
+    """Open a snapshot as a ColumnarStore, or a SnapshotStore if read_only
+
+    Arrays are mapped copy-on-write, so writes stay in memory and never
+    change the snapshot. The email index, leaderboards and completion
+    queue are rebuilt on first use.
+    """
+    with open(os.path.join(directory, 'meta.json')) as file:
+        meta = json.load(file)
+
+    store_class = SnapshotStore if read_only else ColumnarStore
+    student_data = store_class(capacity=0, first_id=meta['first id'])
+    mmap_mode = 'r' if read_only else 'c'
+    for column in ('points', 'submissions'):
+        array = np.load(os.path.join(directory, column + '.npy'),
+                        mmap_mode=mmap_mode if meta['size'] else None)
+        setattr(student_data, column + '_array', array)
+    for column in STRING_COLUMNS:
+        setattr(student_data, column.replace(' ', '_'),
+                StringTable.load(file_name(directory, column)))
+    student_data.size = meta['size']
+    student_data.next_id = meta['first id'] + meta['size']
+    student_data.totals = meta['totals']
+    student_data.email_index = None
+    student_data.leaderboards = None
+    student_data.completions = None
+
+    student_data.sent = CourseBits(
+        np.load(os.path.join(directory, 'sent.npy')).tobytes())
+    return student_data
+
+
+class SnapshotStore(ColumnarStore):
+    """Read-only store answering statistics straight from snapshot arrays
+
+    Course tables and ranks are computed from the mapped arrays with
+    vectorized operations instead of building leaderboards, so a single
+    query never creates per-student Python objects beyond its output.
+    """
+    CHUNK_ROWS = 10_000  # Rows turned into tuples at once by iter_course_stats
+
+    def insert_students(self, students):
+        raise TypeError('a snapshot opened read-only cannot be changed')
+
+    def apply_points(self, student_id, points, submissions):
+        raise TypeError('a snapshot opened read-only cannot be changed')
+
+    apply_points_bulk = apply_points
+
+    def view(self):
+        """Return the store itself, as it never changes"""
+        return self
+
+    def course_stats(self, course, start=0, stop=None):
+        ids, points = self.course_columns(course, start, stop)
+        completed = points / COMPLETE_POINTS[course]
+        return list(zip(ids.tolist(), points.tolist(), completed.tolist()))
+
+    def iter_course_stats(self, course, start=0, stop=None):
+        """Yield rows of course_stats, sorted once into arrays
+        and turned into tuples CHUNK_ROWS at a time"""
+        ids, points = self.course_columns(course, start, stop)
+        complete = COMPLETE_POINTS[course]
+        for i in range(0, len(ids), self.CHUNK_ROWS):
+            chunk = points[i:i + self.CHUNK_ROWS]
+            yield from zip(ids[i:i + self.CHUNK_ROWS].tolist(), chunk.tolist(),
+                           (chunk / complete).tolist())
+
+    def course_columns(self, course, start=0, stop=None
+                       ) -> (np.ndarray, np.ndarray):
+        """Return ids and points of students enrolled in course,
+        ordered as in course_stats"""
+        rows = np.flatnonzero(self.points_array[:self.size, course])
+        points = self.points_array[rows, course]
+        if stop is not None and stop < len(rows):
+            if stop <= start:
+                rows, points = rows[:0], points[:0]
+            else:
+                # Only the top stop students get sorted: those above the
+                # points of the stop-th one, then the first rows tied with it
+                last = points[np.argpartition(-points, stop - 1)[stop - 1]]
+                above = np.flatnonzero(points > last)
+                tied = np.flatnonzero(points == last)[:stop - len(above)]
+                kept = np.sort(np.concatenate((above, tied)))
+                rows, points = rows[kept], points[kept]
+        if points.max(initial=0) < MAX_POINTS // (self.size or 1):
+            # Points descending, then row ascending, as one integer key,
+            # much faster to sort than the two of them
+            keys = np.sort(-points * self.size + rows)[start:stop]
+            rows = keys % self.size if self.size else keys
+        else:
+            rows = rows[np.lexsort((rows, -points))[start:stop]]
+        return rows + self.first_id, self.points_array[rows, course]
+
+    def rank(self, student_id, course):
+        points = self.points_array[:self.size, course]
+        row = self.row(student_id)
+        if not points[row]:
+            return None
+        position = (np.count_nonzero(points > points[row])
+                    + np.count_nonzero(points[:row] == points[row]) + 1)
+        return int(position), int(np.count_nonzero(points))
@@ -0,0 +1,1258 @@
+"""Student stores
+
+A store keeps credentials, points and submissions of every student.
+Subshells only talk to a store through the methods of Store,
+so backends can be swapped without touching them.
+"""
+import contextlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import weakref
+from array import array
+from collections.abc import Iterator
+
+import numpy as np
+
+from constants import COURSE_NAMES, COMPLETE_POINTS, FIRST_ID, MAX_POINTS
+from bitset import CourseBits
+from leaderboard import Leaderboard
+from memory import deep_size
+
+COURSES = len(COURSE_NAMES)
+
+
+class Store:
+    """Base class for all student stores
+
+    Students get ids from a counter starting at first_id, so ids are
+    stable between runs and never collide, and an email index makes
+    the duplicate check O(1).
+
+    Besides the students themselves every store keeps running per-course
+    totals and a leaderboard per course, both updated on every write,
+    so statistics never scan or sort students.
+
+    Stores also remember which (student_id, course) notifications
+    have been sent, and queue (student_id, course) completions as soon
+    as points cross COMPLETE_POINTS, so notifying only drains the queue.
+
+    Writes are appended to `log`, a wal.Log, if there is one,
+    and made durable by commit.
+
+    A view of the store, see StoreView, stays as the store was when it
+    was taken while writes go on. Every write first hands the old points
+    of its student to live views, which are reclaimed with their last
+    reference.
+
+    The email index, leaderboards and completion queue can be dropped
+    by setting them to None, as a freshly loaded snapshot does; they are
+    then rebuilt from the students on first use.
+    """
+
+    def __init__(self, first_id=FIRST_ID):
+        self.first_id = first_id
+        self.next_id = first_id
+        self._email_index = {}
+        self.log = None
+        self.totals = {'enrolled': [0] * COURSES,
+                       'submissions': [0] * COURSES,
+                       'points': [0] * COURSES}
+        self._leaderboards = [Leaderboard() for _ in range(COURSES)]
+        self.sent = CourseBits()
+        self.completions = []
+        self.views = weakref.WeakSet()
+
+    @property
+    def email_index(self) -> dict:
+        if self._email_index is None:
+            self._email_index = self.build_email_index()
+        return self._email_index
+
+    @email_index.setter
+    def email_index(self, value):
+        self._email_index = value
+
+    @property
+    def leaderboards(self) -> [Leaderboard, ...]:
+        self.build_dropped_leaderboards()
+        return self._leaderboards
+
+    @leaderboards.setter
+    def leaderboards(self, value):
+        self._leaderboards = value
+
+    def build_dropped_leaderboards(self):
+        """Build leaderboards, if dropped, before points change under them"""
+        if self._leaderboards is None:
+            self._leaderboards = self.build_leaderboards()
+
+    def build_email_index(self) -> dict:
+        return {self.student(student_id)['email']: student_id
+                for student_id in self}
+
+    def build_leaderboards(self) -> [Leaderboard, ...]:
+        leaderboards = []
+        for course in range(COURSES):
+            keys = [(-self.points(student_id)[course], student_id)
+                    for student_id in self if self.points(student_id)[course]]
+            leaderboards.append(Leaderboard.from_sorted(sorted(keys)))
+        return leaderboards
+
+    def __contains__(self, student_id) -> bool:
+        raise NotImplementedError
+
+    def __iter__(self):
+        """Iterate over student ids in insertion order"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def email_taken(self, email) -> bool:
+        return email in self.email_index
+
+    def add_student(self, creds: dict) -> int:
+        """Add a student with zeroed points and submissions,
+        return their new id"""
+        return self.add_students([creds])[0]
+
+    def add_students(self, students) -> [int, ...]:
+        """Add students given by their credentials, return their new ids"""
+        students = list(students)
+        student_ids = list(range(self.next_id, self.next_id + len(students)))
+        if self.log is not None:  # First, as it may fail
+            self.log.add_students(zip(student_ids, students))
+        self.next_id += len(students)
+        self.email_index.update(
+            zip((creds['email'] for creds in students), student_ids))
+        self.insert_students(zip(student_ids, students))
+        return student_ids
+
+    def insert_students(self, students):
+        """Insert (student_id, creds) pairs"""
+        raise NotImplementedError
+
+    def add_points(self, student_id, points, submissions=None):
+        """Add points to a student, counting a submission for every
+        course with non-zero points unless submissions are given"""
+        if submissions is None:
+            submissions = [int(bool(p)) for p in points]
+        self.check_points([student_id], [points])
+        if self.log is not None:
+            self.log.add_points(student_id, points, submissions)
+        self.build_dropped_leaderboards()
+        old_points = self.points(student_id)
+        self.apply_points(student_id, points, submissions)
+        self.update_indexes(student_id, old_points, points, submissions)
+
+    def add_points_bulk(self, student_ids, points, submissions):
+        """Add rows of points and submission counts to distinct students"""
+        self.check_points(student_ids, points)
+        if self.log is not None:
+            for row in zip(student_ids, points.tolist(), submissions.tolist()):
+                self.log.add_points(*row)
+        self.build_dropped_leaderboards()
+        self.apply_points_bulk(student_ids, points, submissions)
+
+    def check_points(self, student_ids, points):
+        """Raise ValueError if adding rows of points to distinct students
+        would take any of them past MAX_POINTS in a course, before
+        anything is logged or applied"""
+        if isinstance(points, np.ndarray):
+            tops = points.max(axis=0, initial=0).tolist()
+            points = points.tolist()
+        else:
+            tops = [max(column, default=0) for column in zip(*points)]
+        if all(bound + top <= MAX_POINTS
+               for bound, top in zip(self.points_bound(), tops)):
+            return
+        for student_id, row in zip(student_ids, points):
+            if any(old + new > MAX_POINTS
+                   for old, new in zip(self.points(student_id), row)):
+                raise ValueError(f'Points of student {student_id} '
+                                 f'would exceed {MAX_POINTS}.')
+
+    def points_bound(self) -> [int, ...]:
+        """Return per course a number of points no student exceeds"""
+        return self.totals['points']
+
+    def apply_points_bulk(self, student_ids, points, submissions):
+        for student_id, row, submission_row in zip(
+                student_ids, points.tolist(), submissions.tolist()):
+            old_points = self.points(student_id)
+            self.apply_points(student_id, row, submission_row)
+            self.update_indexes(student_id, old_points, row, submission_row)
+
+    def apply_points(self, student_id, points, submissions):
+        raise NotImplementedError
+
+    def update_indexes(self, student_id, old_points, points, submissions):
+        if self.views:
+            for view in self.views:
+                view.keep(student_id, old_points)
+        for course, (old, new, count) in enumerate(
+                zip(old_points, points, submissions)):
+            if new:
+                self.update_course(course, student_id, old, new, count)
+
+    def update_course(self, course, student_id, old, new, count):
+        """Count new points and submissions of a student, who had old
+        points, in the totals, leaderboard and completions of a course"""
+        self.totals['enrolled'][course] += not old
+        self.totals['submissions'][course] += count
+        self.totals['points'][course] += new
+        self.update_leaderboard(course, student_id, old, old + new)
+        if (self.completions is not None
+                and old < COMPLETE_POINTS[course] <= old + new):
+            self.completions.append((student_id, course))
+
+    def update_leaderboard(self, course, student_id, old, new):
+        self.leaderboards[course].update(student_id, old, new)
+
+    def check_totals(self) -> bool:
+        """Compare running totals against a full scan of all students"""
+        return self.totals == {
+            'enrolled': self.column_sum('submissions', counting_mode=True),
+            'submissions': self.column_sum('submissions'),
+            'points': self.column_sum('points')}
+
+    def student(self, student_id) -> dict:
+        """Return credentials of a student"""
+        raise NotImplementedError
+
+    def points(self, student_id) -> [int, ...]:
+        raise NotImplementedError
+
+    def course_stats(self, course: int, start=0, stop=None
+                     ) -> [(int, int, float), ...]:
+        """Return stats of students enrolled in course as a sequence of
+        tuples (id, points, completed) sorted by points, then id.
+
+        Only positions from start to stop are returned, if given.
+        """
+        return list(self.iter_course_stats(course, start, stop))
+
+    def iter_course_stats(self, course: int, start=0, stop=None
+                          ) -> Iterator[tuple[int, int, float]]:
+        """Yield what course_stats returns one row at a time, reading
+        the rows as they are yielded"""
+        complete = COMPLETE_POINTS[course]
+        for student_id, points in self.leaderboards[course].slice(start, stop):
+            yield student_id, points, points / complete
+
+    def rank(self, student_id, course: int) -> tuple[int, int] | None:
+        """Return 1-based position of a student in a course leaderboard
+        and the number of enrolled students, or None if not enrolled"""
+        leaderboard = self.leaderboards[course]
+        position = leaderboard.rank(student_id, self.points(student_id)[course])
+        return position and (position, len(leaderboard))
+
+    def column_sum(self, column: str, counting_mode=False) -> [int, ...]:
+        """Sum 'points' or 'submissions' of all students per course.
+
+        In counting mode count students with non-zero values instead.
+        """
+        raise NotImplementedError
+
+    def completed(self):
+        """Yield (student_id, course) for every completed course,
+        grouped by student in insertion order"""
+        raise NotImplementedError
+
+    def pending_completions(self) -> [(int, int), ...]:
+        """Drain (student_id, course) completions queued since
+        the last call, sorted by student, then course.
+
+        Some of them may have been notified already, see mark_sent.
+        """
+        if self.completions is None:
+            pending = list(self.completed())
+        else:
+            pending = sorted(self.completions)
+        self.completions = []
+        return pending
+
+    def mark_sent(self, student_id, course) -> bool:
+        """Remember a notification as sent,
+        return False if it already was"""
+        if not self.sent.test_and_set(student_id - self.first_id, course):
+            return False
+        if self.log is not None:
+            self.log.notify(student_id, course)
+        return True
+
+    def sent_notifications(self) -> [(int, int), ...]:
+        return [(row + self.first_id, course) for row, course in self.sent]
+
+    def load_sent(self, notifications):
+        """Remember (student_id, course) notifications as sent
+        without logging them"""
+        for student_id, course in notifications:
+            self.sent.test_and_set(student_id - self.first_id, course)
+
+    def sent_bits(self) -> CourseBits:
+        return self.sent
+
+    def view(self) -> 'Store':
+        """Return a read-only view of the store as it is now"""
+        with self.reading():
+            view = StoreView(self)
+            self.views.add(view)
+        return view
+
+    def student_lock(self, student_id):
+        """Return a context in which no one else changes a student"""
+        return contextlib.nullcontext()
+
+    def adding(self):
+        """Return a context in which no one else adds students,
+        to check emails and add students as one step"""
+        return contextlib.nullcontext()
+
+    def reading(self):
+        """Return a context in which no one else writes,
+        to read a consistent state of many students"""
+        return contextlib.nullcontext()
+
+    def commit(self):
+        """Make writes so far durable"""
+        if self.log is not None:
+            self.log.commit()
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+
+    def columns(self) -> (np.ndarray, np.ndarray, [str, ...], [str, ...], [str, ...]):
+        """Return points and submissions as students x courses arrays,
+        then first names, last names and emails, all in insertion order"""
+        raise NotImplementedError
+
+    def memory(self) -> dict:
+        """Return bytes used by each component of the store,
+        see memory.deep_size"""
+        seen = set()
+        components = self.student_memory(seen)
+        components['leaderboards'] = deep_size(self._leaderboards, seen=seen)
+        components['email index'] = deep_size(self._email_index, seen=seen)
+        components['completion queue'] = deep_size(self.completions, seen=seen)
+        components['sent notifications'] = deep_size(self.sent, seen=seen)
+        if self.views:
+            components['views'] = deep_size(*(
+                (view.old_points, view.totals, view._leaderboards)
+                for view in self.views), seen=seen)
+        return components
+
+    def student_memory(self, seen) -> dict:
+        """Return bytes of the student records and of points and
+        submissions, not counting objects in seen"""
+        raise NotImplementedError
+
+
+class StoreView(Store):
+    """Read-only view of a store as it was when the view was taken
+
+    Taking a view copies the totals and snapshots the leaderboards,
+    which then share their buckets with the store's. Students added
+    later have ids past next_id, so the view skips them, and the store
+    hands the view old points of every student before changing them,
+    so points are read from the store only for students not changed
+    since.
+    """
+
+    def __init__(self, store: Store):
+        super().__init__(store.first_id)
+        self.store = store
+        self.next_id = store.next_id
+        self.totals = {name: list(totals) for name, totals in store.totals.items()}
+        self.leaderboards = [leaderboard.snapshot()
+                             for leaderboard in store.leaderboards]
+        self.old_points = {}
+
+    def keep(self, student_id, old_points):
+        """Remember points of a student the store is about to change"""
+        if student_id < self.next_id:
+            self.old_points.setdefault(student_id, old_points)
+
+    def __contains__(self, student_id):
+        return student_id in self.store and student_id < self.next_id
+
+    def __iter__(self):
+        return itertools.takewhile(lambda student_id: student_id < self.next_id,
+                                   iter(self.store))
+
+    def __len__(self):
+        return self.next_id - self.first_id
+
+    def add_students(self, students):
+        raise TypeError('a store view cannot be changed')
+
+    def apply_points(self, student_id, points, submissions):
+        raise TypeError('a store view cannot be changed')
+
+    apply_points_bulk = apply_points
+
+    def mark_sent(self, student_id, course):
+        raise TypeError('a store view cannot be changed')
+
+    def student(self, student_id):
+        return self.store.student(student_id)
+
+    def points(self, student_id):
+        with self.store.student_lock(student_id):
+            old_points = self.old_points.get(student_id)
+            if old_points is None:
+                return self.store.points(student_id)
+        return list(old_points)
+
+    def view(self):
+        return self
+
+
+class Student:
+    """Compact record of a student
+
+    Names are interned, so students sharing a first or last name share
+    one string. The 4 points and 4 submission counts are signed 64-bit
+    ints packed into a single array, kept within MAX_POINTS by
+    Store.check_points.
+    """
+    __slots__ = ('email', 'first_name', 'last_name', 'counters')
+
+    def __init__(self, creds):
+        self.email = creds['email']
+        self.first_name = sys.intern(creds['first name'])
+        self.last_name = sys.intern(creds['last name'])
+        self.counters = array('q', bytes(2 * COURSES * 8))
+
+    @property
+    def points(self):
+        return self.counters[:COURSES]
+
+    @property
+    def submissions(self):
+        return self.counters[COURSES:]
+
+    def creds(self) -> dict:
+        return {'email': self.email,
+                'first name': self.first_name,
+                'last name': self.last_name}
+
+
+class DictStore(Store):
+    """Store keeping a compact Student record per id in a dict"""
+
+    def __init__(self, first_id=FIRST_ID):
+        super().__init__(first_id)
+        self.data = {}
+
+    def __contains__(self, student_id):
+        return student_id in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def insert_students(self, students):
+        for student_id, creds in students:
+            self.data[student_id] = Student(creds)
+
+    def apply_points(self, student_id, points, submissions):
+        counters = self.data[student_id].counters
+        for course, (p, s) in enumerate(zip(points, submissions)):
+            counters[course] += p
+            counters[COURSES + course] += s
+
+    def student(self, student_id):
+        return self.data[student_id].creds()
+
+    def points(self, student_id):
+        return self.data[student_id].points.tolist()
+
+    def column_sum(self, column, counting_mode=False):
+        out = [0] * COURSES
+        for student in self.data.values():
+            field = getattr(student, column)
+            if counting_mode:
+                field = [int(bool(n)) for n in field]
+            out = [x + y for x, y in zip(out, field)]
+        return out
+
+    def completed(self):
+        for student_id, student in self.data.items():
+            for course, (points, complete) in enumerate(
+                    zip(student.points, COMPLETE_POINTS)):
+                if points >= complete:
+                    yield student_id, course
+
+    def columns(self):
+        students = self.data.values()
+        counters = np.frombuffer(
+            b''.join(student.counters.tobytes() for student in students),
+            dtype=np.int64).reshape(-1, 2 * COURSES)
+        return (counters[:, :COURSES], counters[:, COURSES:],
+                [s.first_name for s in students],
+                [s.last_name for s in students],
+                [s.email for s in students])
+
+    def student_memory(self, seen):
+        counters = deep_size(*(s.counters for s in self.data.values()), seen=seen)
+        return {'student records': deep_size(self.data, seen=seen),
+                'points and submissions': counters}
+
+
+class ShardedStore(DictStore):
+    """DictStore which threads can share
+
+    Students are sharded by id over SHARDS lock stripes. A points update
+    holds only the lock of its student's shard while it reads and adds
+    to the record, so updates of students in different shards do not
+    wait for each other. The totals, leaderboard and completions of a
+    course are then updated under the lock of that course only.
+
+    Adding students, the log and sent notifications share one lock.
+    Locks are always taken in the order shards, courses, that one lock,
+    which is also how reading takes all of them to stop every writer.
+    """
+    SHARDS = 64
+
+    def __init__(self, first_id=FIRST_ID, shards=SHARDS):
+        super().__init__(first_id)
+        self.shard_locks = [threading.RLock() for _ in range(shards)]
+        self.course_locks = [threading.RLock() for _ in range(COURSES)]
+        self.lock = threading.RLock()
+
+    def student_lock(self, student_id):
+        return self.shard_locks[student_id % len(self.shard_locks)]
+
+    def build_dropped_leaderboards(self):
+        if self._leaderboards is None:
+            with self.reading():
+                super().build_dropped_leaderboards()
+
+    def add_students(self, students):
+        with self.lock:
+            return super().add_students(students)
+
+    def add_points(self, student_id, points, submissions=None):
+        if submissions is None:
+            submissions = [int(bool(p)) for p in points]
+        self.build_dropped_leaderboards()
+        with self.student_lock(student_id):
+            self.check_points([student_id], [points])
+            if self.log is not None:
+                with self.lock:
+                    self.log.add_points(student_id, points, submissions)
+            old_points = self.points(student_id)
+            self.apply_points(student_id, points, submissions)
+            self.update_indexes(student_id, old_points, points, submissions)
+
+    def add_points_bulk(self, student_ids, points, submissions):
+        self.check_points(student_ids, points)  # Before any row is added
+        for row in zip(student_ids, points.tolist(), submissions.tolist()):
+            self.add_points(*row)
+
+    def update_course(self, course, student_id, old, new, count):
+        with self.course_locks[course]:
+            super().update_course(course, student_id, old, new, count)
+
+    def points(self, student_id):
+        with self.student_lock(student_id):
+            return super().points(student_id)
+
+    def pending_completions(self):
+        with self.reading():
+            return super().pending_completions()
+
+    def mark_sent(self, student_id, course):
+        with self.lock:
+            return super().mark_sent(student_id, course)
+
+    def adding(self):
+        return self.lock
+
+    @contextlib.contextmanager
+    def reading(self):
+        with contextlib.ExitStack() as stack:
+            for lock in (*self.shard_locks, *self.course_locks, self.lock):
+                stack.enter_context(lock)
+            yield
+
+    def commit(self):
+        with self.lock:
+            super().commit()
+
+
+class ColumnarStore(Store):
+    """Store keeping points and submissions in students x courses arrays
+
+    Students are rows, in insertion order. Since ids come from a counter,
+    the row of a student is simply their id minus first_id.
+    Credentials are kept in plain lists next to the arrays.
+    Arrays grow by doubling, so adding a student is amortized O(1).
+    """
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, capacity=INITIAL_CAPACITY, first_id=FIRST_ID):
+        super().__init__(first_id)
+        self.size = 0
+        self.points_array = np.zeros((capacity, COURSES), dtype=np.int64)
+        self.submissions_array = np.zeros((capacity, COURSES), dtype=np.int64)
+        self.emails = []
+        self.first_names = []
+        self.last_names = []
+
+    def __contains__(self, student_id):
+        return (isinstance(student_id, int)
+                and 0 <= student_id - self.first_id < self.size)
+
+    def __iter__(self):
+        return iter(range(self.first_id, self.first_id + self.size))
+
+    def __len__(self):
+        return self.size
+
+    def row(self, student_id) -> int:
+        return student_id - self.first_id
+
+    def grow(self, capacity):
+        for name in ('points_array', 'submissions_array'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, COURSES), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def insert_students(self, students):
+        students = list(students)
+        if self.size + len(students) > len(self.points_array):
+            capacity = max(1, len(self.points_array))
+            while self.size + len(students) > capacity:
+                capacity *= 2
+            self.grow(capacity)
+        for student_id, creds in students:
+            self.emails.append(creds['email'])
+            self.first_names.append(creds['first name'])
+            self.last_names.append(creds['last name'])
+        self.size += len(students)
+
+    def build_email_index(self):
+        return dict(zip(self.emails, self))
+
+    def build_leaderboards(self):
+        leaderboards = []
+        for course in range(COURSES):
+            points = self.points_array[:self.size, course]
+            rows = np.flatnonzero(points)
+            order = np.lexsort((rows, -points[rows]))
+            rows = rows[order]
+            keys = zip((-points[rows]).tolist(), (rows + self.first_id).tolist())
+            leaderboards.append(Leaderboard.from_sorted(list(keys)))
+        return leaderboards
+
+    def apply_points(self, student_id, points, submissions):
+        row = self.row(student_id)
+        self.points_array[row] += points
+        self.submissions_array[row] += submissions
+
+    def apply_points_bulk(self, student_ids, points, submissions):
+        rows = np.asarray(student_ids, dtype=np.int64) - self.first_id
+        old_points = self.points_array[rows]
+        self.points_array[rows] += points
+        self.submissions_array[rows] += submissions
+
+        if self.views:
+            for view in self.views:
+                for student_id, old in zip(student_ids, old_points.tolist()):
+                    view.keep(student_id, old)
+
+        enrolled = np.count_nonzero((old_points == 0) & (points != 0), axis=0)
+        for name, column in (('enrolled', enrolled),
+                             ('submissions', column_totals(submissions)),
+                             ('points', column_totals(points))):
+            self.totals[name] = [
+                total + int(x) for total, x in zip(self.totals[name], column)]
+        for course, leaderboard in enumerate(self.leaderboards):
+            for i in np.flatnonzero(points[:, course]).tolist():
+                old = int(old_points[i, course])
+                leaderboard.update(student_ids[i], old, old + int(points[i, course]))
+
+        if self.completions is not None:
+            crossed = ((old_points < COMPLETE_POINTS)
+                       & (old_points + points >= COMPLETE_POINTS))
+            indexes, courses = np.nonzero(crossed)
+            self.completions.extend(zip(
+                (rows[indexes] + self.first_id).tolist(), courses.tolist()))
+
+    def student(self, student_id):
+        row = self.row(student_id)
+        return {'email': self.emails[row],
+                'first name': self.first_names[row],
+                'last name': self.last_names[row]}
+
+    def points(self, student_id):
+        return self.points_array[self.row(student_id)].tolist()
+
+    def column_sum(self, column, counting_mode=False):
+        array = getattr(self, column + '_array')[:self.size]
+        if counting_mode:
+            return np.count_nonzero(array, axis=0).tolist()
+        return column_totals(array)
+
+    def completed(self):
+        done = self.points_array[:self.size] >= COMPLETE_POINTS
+        rows, courses = np.nonzero(done)
+        return zip((rows + self.first_id).tolist(), courses.tolist())
+
+    def columns(self):
+        return (self.points_array[:self.size], self.submissions_array[:self.size],
+                self.first_names, self.last_names, self.emails)
+
+    def student_memory(self, seen):
+        return {'student records': deep_size(
+                    self.emails, self.first_names, self.last_names, seen=seen),
+                'points and submissions': deep_size(
+                    self.points_array, self.submissions_array, seen=seen)}
+
+
+class SqliteStore(Store):
+    """Store keeping students and sent notifications in an SQLite database
+
+    Points and submissions are columns p0-p3 and s0-s3 of the students
+    table. A partial index per course, on points descending then id,
+    serves course tables and ranks with ORDER BY ... LIMIT and COUNT
+    queries. Statements are fixed strings, so sqlite3 prepares each of
+    them once and reuses it. Writes are grouped into one transaction
+    until commit, which Tracker calls after every command. A database
+    file is in WAL journal mode, so views can read it in transactions of
+    their own while writes go on. An in-memory database could not be
+    read that way, so ':memory:' is a temporary file instead, removed
+    with the store and never synced.
+
+    Running totals are computed with one aggregate query on opening
+    and then maintained like in every other store. TOTAL() adds up
+    floats, and SUM() fails past int64, so columns are summed exactly
+    in two halves of 32 bits, see SUMS.
+    """
+    POINTS = ', '.join(f'p{course}' for course in range(COURSES))
+    SUBMISSIONS = ', '.join(f's{course}' for course in range(COURSES))
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS students ('
+        'id INTEGER PRIMARY KEY, email TEXT NOT NULL UNIQUE, '
+        'first_name TEXT NOT NULL, last_name TEXT NOT NULL, '
+        + ', '.join(f'{column} INTEGER NOT NULL DEFAULT 0'
+                    for column in (POINTS + ', ' + SUBMISSIONS).split(', '))
+        + ')',
+        'CREATE TABLE IF NOT EXISTS sent ('
+        'student_id INTEGER, course INTEGER, '
+        'PRIMARY KEY (student_id, course)) WITHOUT ROWID',
+        *(f'CREATE INDEX IF NOT EXISTS leaderboard{course} '
+          f'ON students (p{course} DESC, id) WHERE p{course} > 0'
+          for course in range(COURSES)),
+    )
+    INSERT = ('INSERT INTO students (id, email, first_name, last_name) '
+              'VALUES (?, ?, ?, ?)')
+    UPDATE = ('UPDATE students SET '
+              + ', '.join(f'{c} = {c} + ?'
+                          for c in (POINTS + ', ' + SUBMISSIONS).split(', '))
+              + ' WHERE id = ?')
+    COUNTS = {prefix: ', '.join(f'TOTAL({prefix}{c} > 0)' for c in range(COURSES))
+              for prefix in 'ps'}
+    SUMS = {prefix: ', '.join(f'IFNULL(SUM({prefix}{c} >> 32), 0), '
+                              f'IFNULL(SUM({prefix}{c} & 4294967295), 0)'
+                              for c in range(COURSES))
+            for prefix in 'ps'}
+    TOTALS = f"SELECT {COUNTS['p']}, {SUMS['s']}, {SUMS['p']} FROM students"
+    COURSE_STATS = [f'SELECT id, p{c} FROM students WHERE p{c} > 0 '
+                    f'ORDER BY p{c} DESC, id LIMIT ? OFFSET ?'
+                    for c in range(COURSES)]
+    RANK = [f'SELECT (SELECT COUNT(*) FROM students WHERE p{c} > 0 AND p{c} > ?1)'
+            f' + (SELECT COUNT(*) FROM students WHERE p{c} > 0 AND p{c} = ?1'
+            f' AND id < ?2)'
+            for c in range(COURSES)]
+    ENROLLED = [f'SELECT COUNT(*) FROM students WHERE p{c} > 0'
+                for c in range(COURSES)]
+    COMPLETED = (' UNION ALL '.join(
+        f'SELECT id, {c} FROM students WHERE p{c} >= {COMPLETE_POINTS[c]}'
+        for c in range(COURSES)) + ' ORDER BY 1, 2')
+
+    def __init__(self, path=':memory:', first_id=FIRST_ID, connection=None,
+                 totals=None):
+        """Open the database at path, or read it through connection
+        with given totals"""
+        super().__init__(first_id)
+        self.directory = None  # Of the file of an in-memory database
+        if connection is None:
+            if path == ':memory:':
+                self.directory = tempfile.TemporaryDirectory(prefix='tracker-')
+                path = os.path.join(self.directory.name, 'students.db')
+            connection = sqlite3.connect(path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            if self.directory is not None:
+                connection.execute('PRAGMA synchronous=OFF')
+        self.path = path
+        self.connection = connection
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        last_id, = self.connection.execute(
+            'SELECT MAX(id) FROM students').fetchone()
+        if last_id is not None:
+            self.next_id = last_id + 1
+        first, = self.connection.execute(
+            'SELECT MIN(id) FROM students').fetchone()
+        if first is not None:
+            self.first_id = first
+        if totals is None:
+            row = self.connection.execute(self.TOTALS).fetchone()
+            totals = ([int(x) for x in row[:COURSES]]
+                      + self.join_halves(row[COURSES:]))
+            totals = {name: totals[i * COURSES:(i + 1) * COURSES]
+                      for i, name in enumerate(self.totals)}
+        self.totals = totals
+        self.email_index = None
+        self.leaderboards = None
+        self.completions = None
+
+    def __contains__(self, student_id):
+        return isinstance(student_id, int) and self.connection.execute(
+            'SELECT 1 FROM students WHERE id = ?', (student_id,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        cursor = self.connection.execute('SELECT id FROM students ORDER BY id')
+        return (student_id for student_id, in cursor)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+
+    def email_taken(self, email):
+        return self.connection.execute(
+            'SELECT 1 FROM students WHERE email = ?', (email,)
+        ).fetchone() is not None
+
+    def add_students(self, students):
+        students = list(students)
+        student_ids = list(range(self.next_id, self.next_id + len(students)))
+        if self.log is not None:
+            self.log.add_students(zip(student_ids, students))
+        self.next_id += len(students)
+        self.connection.executemany(self.INSERT, (
+            (student_id, creds['email'], creds['first name'], creds['last name'])
+            for student_id, creds in zip(student_ids, students)))
+        return student_ids
+
+    def build_dropped_leaderboards(self):
+        """Leaderboards are indexes of the database"""
+
+    def view(self):
+        """Return a store reading the database as it is now through a
+        connection of its own, in a read transaction kept open for as
+        long as the view lives. Totals of the store match what it has
+        just committed, so the view takes a copy of them."""
+        self.connection.commit()
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute('BEGIN')  # Its first read pins the version
+        totals = {name: list(totals) for name, totals in self.totals.items()}
+        view = SqliteStore(self.path, self.first_id, connection, totals)
+        view.directory = self.directory  # Kept until the view is gone too
+        return view
+
+    def apply_points(self, student_id, points, submissions):
+        self.connection.execute(self.UPDATE, (*points, *submissions, student_id))
+
+    def apply_points_bulk(self, student_ids, points, submissions):
+        old_points = [self.points(student_id) for student_id in student_ids]
+        self.connection.executemany(self.UPDATE, (
+            (*row, *submission_row, student_id) for student_id, row, submission_row
+            in zip(student_ids, points.tolist(), submissions.tolist())))
+        for student_id, old, row, submission_row in zip(
+                student_ids, old_points, points.tolist(), submissions.tolist()):
+            self.update_indexes(student_id, old, row, submission_row)
+
+    def update_leaderboard(self, course, student_id, old, new):
+        """Leaderboards are indexes of the database"""
+
+    def student(self, student_id):
+        email, first_name, last_name = self.connection.execute(
+            'SELECT email, first_name, last_name FROM students WHERE id = ?',
+            (student_id,)).fetchone()
+        return {'email': email, 'first name': first_name, 'last name': last_name}
+
+    def points(self, student_id):
+        return list(self.connection.execute(
+            f'SELECT {self.POINTS} FROM students WHERE id = ?',
+            (student_id,)).fetchone())
+
+    def iter_course_stats(self, course, start=0, stop=None):
+        limit = -1 if stop is None else max(stop - start, 0)
+        complete = COMPLETE_POINTS[course]
+        for student_id, points in self.connection.execute(
+                self.COURSE_STATS[course], (limit, start)):
+            yield student_id, points, points / complete
+
+    def rank(self, student_id, course):
+        points = self.points(student_id)[course]
+        if not points:
+            return None
+        ahead, = self.connection.execute(
+            self.RANK[course], (points, student_id)).fetchone()
+        enrolled, = self.connection.execute(self.ENROLLED[course]).fetchone()
+        return ahead + 1, enrolled
+
+    def column_sum(self, column, counting_mode=False):
+        prefix = column[0]
+        if counting_mode:
+            row = self.connection.execute(
+                f'SELECT {self.COUNTS[prefix]} FROM students').fetchone()
+            return [int(x) for x in row]
+        row = self.connection.execute(
+            f'SELECT {self.SUMS[prefix]} FROM students').fetchone()
+        return self.join_halves(row)
+
+    @staticmethod
+    def join_halves(row) -> [int, ...]:
+        """Return sums of columns from pairs of sums of their halves"""
+        return [(high << 32) + low for high, low in zip(row[::2], row[1::2])]
+
+    def completed(self):
+        return self.connection.execute(self.COMPLETED)
+
+    def mark_sent(self, student_id, course):
+        inserted = self.connection.execute(
+            'INSERT OR IGNORE INTO sent VALUES (?, ?)', (student_id, course)
+        ).rowcount
+        if inserted and self.log is not None:
+            self.log.notify(student_id, course)
+        return bool(inserted)
+
+    def sent_notifications(self):
+        return self.connection.execute(
+            'SELECT student_id, course FROM sent ORDER BY 1, 2').fetchall()
+
+    def sent_bits(self):
+        bits = CourseBits()
+        for student_id, course in self.sent_notifications():
+            bits.test_and_set(student_id - self.first_id, course)
+        return bits
+
+    def load_sent(self, notifications):
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO sent VALUES (?, ?)', notifications)
+
+    def columns(self):
+        rows = self.connection.execute(
+            f'SELECT {self.POINTS}, {self.SUBMISSIONS}, '
+            f'first_name, last_name, email FROM students ORDER BY id').fetchall()
+        counters = np.array([row[:2 * COURSES] for row in rows],
+                            dtype=np.int64).reshape(-1, 2 * COURSES)
+        return (counters[:, :COURSES], counters[:, COURSES:],
+                [row[-3] for row in rows], [row[-2] for row in rows],
+                [row[-1] for row in rows])
+
+    def student_memory(self, seen):
+        """Everything is in the database, whose pages are counted whole"""
+        pages, = self.connection.execute('PRAGMA page_count').fetchone()
+        page_size, = self.connection.execute('PRAGMA page_size').fetchone()
+        return {'database': pages * page_size}
+
+    def commit(self):
+        super().commit()
+        self.connection.commit()
+
+    def close(self):
+        self.commit()
+        super().close()
+        self.connection.close()
+
+
+class Shard(DictStore):
+    """Students of one worker of a ProcessStore, in the worker process"""
+
+    def shard_totals(self) -> dict:
+        return self.totals
+
+    def position(self, course, points, student_id) -> (int, int):
+        """Return number of students ahead of a student with given points
+        in a course and number of students enrolled in it"""
+        leaderboard = self.leaderboards[course]
+        return leaderboard.position((-points, student_id)), len(leaderboard)
+
+    def completed_list(self) -> [(int, int), ...]:
+        return list(self.completed())
+
+    def id_columns(self):
+        """Return ids of students followed by their columns"""
+        return list(self), *self.columns()
+
+
+def run_shard(connection):
+    """Serve a Shard in a worker process
+
+    Messages are (name, args, reply) calls of Shard methods, and results
+    of calls to reply to are sent back, exceptions included. The first
+    exception of a call not replied to is sent back instead of the next
+    result, so the worker goes on and the error is not lost. None stops.
+    """
+    shard = Shard()
+    failed = None
+    while (message := connection.recv()) is not None:
+        name, args, reply = message
+        try:
+            result = getattr(shard, name)(*args)
+        except Exception as error:
+            if not reply:
+                failed = failed or error
+                continue
+            result = error
+        if reply:
+            if failed is not None:
+                result, failed = failed, None
+            connection.send(result)
+
+
+def stop_shards(connections, processes):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except OSError:
+            pass
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.kill()
+
+
+class ProcessStore(Store):
+    """Store partitioning students by id over worker processes
+
+    Student i lives in the Shard of worker i % workers, which keeps the
+    points, totals, leaderboards and completion queue of its students.
+    This process keeps only what concerns every student: the id counter,
+    the email index, sent notifications and the log.
+
+    Points updates are sent to the owning worker without waiting for it,
+    and bulk updates are split by worker and applied by all workers at
+    once. Statistics are scattered to every worker and gathered here:
+    totals and column sums are added up, while course tables, ranks,
+    completions and columns are merged from the sorted runs of the
+    workers, so results match a single-process store exactly. A worker
+    handles messages in order, so a read sees every write sent before it,
+    and fails if one of them failed.
+
+    Workers keep no versions of their students, so a view is the store
+    itself and the store cannot be served, see main.py.
+    """
+    WORKERS = 4
+
+    def __init__(self, workers=WORKERS, first_id=FIRST_ID):
+        super().__init__(first_id)
+        self._leaderboards = None
+        self.points_sent = [0] * COURSES
+        self.connections = []
+        processes = []
+        for _ in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_shard, args=(worker_connection,), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            processes.append(process)
+        self.stop = weakref.finalize(self, stop_shards, self.connections, processes)
+
+    def shard(self, student_id) -> int:
+        return student_id % len(self.connections)
+
+    def send(self, shard, name, *args):
+        """Call a method of a worker without waiting for it"""
+        self.connections[shard].send((name, args, False))
+
+    @staticmethod
+    def receive(connection):
+        result = connection.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def call(self, shard, name, *args):
+        """Call a method of a worker and return its result"""
+        self.connections[shard].send((name, args, True))
+        return self.receive(self.connections[shard])
+
+    def scatter(self, name, *args) -> list:
+        """Call a method of every worker at once, return their results"""
+        for connection in self.connections:
+            connection.send((name, args, True))
+        results = [connection.recv() for connection in self.connections]
+        for result in results:  # Raised once every reply is read
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    @property
+    def totals(self) -> dict:
+        totals = self.scatter('shard_totals')
+        return {name: [sum(column) for column in zip(*(t[name] for t in totals))]
+                for name in totals[0]}
+
+    @totals.setter
+    def totals(self, value):
+        """Totals are kept by the workers, ignore the zeroed ones
+        Store.__init__ sets"""
+
+    def build_dropped_leaderboards(self):
+        """Leaderboards are kept by the workers"""
+
+    def __contains__(self, student_id):
+        return (isinstance(student_id, int)
+                and self.first_id <= student_id < self.next_id)
+
+    def __iter__(self):
+        return iter(range(self.first_id, self.next_id))
+
+    def __len__(self):
+        return self.next_id - self.first_id
+
+    def insert_students(self, students):
+        shards = [[] for _ in self.connections]
+        for student_id, creds in students:
+            shards[self.shard(student_id)].append((student_id, creds))
+        for shard, students in enumerate(shards):
+            if students:
+                self.send(shard, 'insert_students', students)
+
+    def add_points(self, student_id, points, submissions=None):
+        if submissions is None:
+            submissions = [int(bool(p)) for p in points]
+        self.check_points([student_id], [points])
+        if self.log is not None:
+            self.log.add_points(student_id, points, submissions)
+        self.points_sent = [sent + p for sent, p in zip(self.points_sent, points)]
+        self.send(self.shard(student_id), 'add_points',
+                  student_id, list(points), list(submissions))
+
+    def points_bound(self):
+        """Points sent to workers, so that checking them takes no call"""
+        return self.points_sent
+
+    def apply_points_bulk(self, student_ids, points, submissions):
+        self.points_sent = [sent + int(total) for sent, total
+                            in zip(self.points_sent, points.sum(axis=0, dtype=object))]
+        student_ids = np.asarray(student_ids, dtype=np.int64)
+        shards = student_ids % len(self.connections)
+        for shard in range(len(self.connections)):
+            mine = shards == shard
+            if mine.any():
+                self.send(shard, 'add_points_bulk', student_ids[mine].tolist(),
+                          points[mine], submissions[mine])
+
+    def student(self, student_id):
+        return self.call(self.shard(student_id), 'student', student_id)
+
+    def points(self, student_id):
+        return self.call(self.shard(student_id), 'points', student_id)
+
+    def iter_course_stats(self, course, start=0, stop=None):
+        """Yield rows merged from the workers, which send whole runs"""
+        runs = self.scatter('course_stats', course, 0, stop)
+        merged = heapq.merge(*runs, key=lambda entry: (-entry[1], entry[0]))
+        return itertools.islice(merged, start, stop)
+
+    def rank(self, student_id, course):
+        points = self.points(student_id)[course]
+        if not points:
+            return None
+        ahead, enrolled = map(sum, zip(*self.scatter(
+            'position', course, points, student_id)))
+        return ahead + 1, enrolled
+
+    def column_sum(self, column, counting_mode=False):
+        sums = self.scatter('column_sum', column, counting_mode)
+        return [sum(course) for course in zip(*sums)]
+
+    def completed(self):
+        return heapq.merge(*self.scatter('completed_list'))
+
+    def pending_completions(self):
+        return list(heapq.merge(*self.scatter('pending_completions')))
+
+    def columns(self):
+        shards = self.scatter('id_columns')
+        order = np.argsort(np.concatenate(
+            [np.asarray(shard[0], dtype=np.int64) for shard in shards]),
+            kind='stable')
+        points, submissions = (
+            np.concatenate([shard[i] for shard in shards])[order] for i in (1, 2))
+        strings = [[value for shard in shards for value in shard[i]]
+                   for i in (3, 4, 5)]
+        return points, submissions, *([column[i] for i in order.tolist()]
+                                      for column in strings)
+
+    def student_memory(self, seen):
+        """Students are kept by the workers"""
+        return {}
+
+    def memory(self):
+        """Return bytes of each component summed over the workers
+        and this process"""
+        components = {}
+        for memory in (*self.scatter('memory'), super().memory()):
+            for name, size in memory.items():
+                components[name] = components.get(name, 0) + size
+        return components
+
+    def view(self):
+        """Return the store itself, as the workers keep no versions"""
+        return self
+
+    def close(self):
+        super().close()
+        self.stop()
+
+
+def column_totals(array: np.ndarray) -> [int, ...]:
+    """Sum columns of a non-negative int64 array, exactly even where
+    sums do not fit in int64"""
+    if array.max(initial=0) > MAX_POINTS // max(len(array), 1):
+        return array.sum(axis=0, dtype=object).tolist()
+    return array.sum(axis=0).tolist()
+
+
+def group_by_student(student_ids, points, submissions=None, lines=None):
+    """Sum points, submission counts and line counts per student id
+
+    Submissions and lines default to one per non-zero point and one
+    per row. Return distinct student ids in ascending order
+    and a row of sums for each of them. Raise ValueError if a sum
+    of points would exceed MAX_POINTS.
+    """
+    if submissions is None:
+        submissions = (points != 0).astype(np.int64)
+    if lines is None:
+        lines = np.ones(len(student_ids), dtype=np.int64)
+    if not len(student_ids):
+        return student_ids, points, submissions, lines
+
+    order = np.argsort(student_ids, kind='stable')
+    student_ids = student_ids[order]
+    starts = np.flatnonzero(np.r_[True, student_ids[1:] != student_ids[:-1]])
+    points = points[order]
+    if points.max(initial=0) > MAX_POINTS // len(points):
+        # Sums may not fit in int64, so add them up exactly first
+        if (np.add.reduceat(points.astype(object), starts) > MAX_POINTS).any():
+            raise ValueError(f'Points of a student would exceed {MAX_POINTS}.')
+    return (student_ids[starts],
+            np.add.reduceat(points, starts),
+            np.add.reduceat(submissions[order], starts),
+            np.add.reduceat(lines[order], starts))
+
+
+STORES = {'dict': DictStore, 'sharded': ShardedStore, 'processes': ProcessStore,
+          'columnar': ColumnarStore, 'sqlite': SqliteStore}
@@ -1,13 +1,23 @@
-import operator
+import csv
+import itertools
+import os
+import sys
 
-from base import Subshell
-from constants import MAX_HASH, COURSE_NAMES, COMPLETE_POINTS
-from parse import parse_points, parse_creds
+import numpy as np
+
+import render
+from base import COMMAND, Subshell
+from constants import COURSE_NAMES, PAGE_SIZE
+from parse import parse_points, parse_points_chunk, split_creds
+from store import group_by_student
+
+INT64 = np.iinfo(np.int64)
 
 
 class AddStudents(Subshell):
     intro = "Enter student credentials or 'back' to return:"
     number_added = 0
+    streams_input = True
 
     def do_back(self, arg):
         if arg == '':
@@ -16,28 +26,63 @@ class AddStudents(Subshell):
 
     def default(self, line):
         """Attempt to add students to student_data"""
-        creds = parse_creds(line)
-        if creds is None:
-            print('Incorrect credentials')
+        try:
+            self.service.add_student(split_creds(line))
+        except ValueError as error:
+            print(error)
             return
-        for key, cred in creds.items():
-            if cred is None:
-                print(f"Incorrect {key}.")
-                return
 
-        student_id = hash(creds['email']) % MAX_HASH
-        if student_id in self.student_data:
-            print('This email is already taken.')
-            return
-        else:
-            self.student_data[student_id] = (
-                    creds | {'points': [0]*4, 'submissions': [0]*4})
-            self.number_added += 1
-            print('The student has been added.')
+        self.number_added += 1
+        print('The student has been added.')
+
+    def import_file(self, path):
+        """Add students from a file, one per line in the interactive format,
+        or one per row of first name, last name and email for .csv/.tsv,
+        skipping a first row without an email address as a header.
+
+        Read '-' from stdin up to a 'back' line instead.
+        """
+        lines = itertools.chain.from_iterable(self.read_chunks(path))
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ('.csv', '.tsv'):
+            delimiter = ',' if extension == '.csv' else '\t'
+            rows = csv.reader(lines, delimiter=delimiter)
+            lines = map(' '.join, self.skip_header(rows))
+        before = len(self.student_data)
+        try:
+            self.import_lines(lines)
+        except (OSError, ValueError, csv.Error):  # Including UnicodeDecodeError
+            print(f'Error: cannot read {path}!')
+            added = len(self.student_data) - before
+            if added:  # In batches before the error
+                self.number_added += added
+                print(f'Total {self.number_added} students have been added.')
+
+    @staticmethod
+    def skip_header(rows):
+        """Yield rows, but not a first one without an email address"""
+        rows = iter(rows)
+        for first in rows:
+            if not first or '@' in first[-1]:
+                yield first
+            break
+        yield from rows
+
+    def import_lines(self, lines):
+        """Add students from lines, accepting and rejecting exactly as
+        default would, and print a summary instead of per-line feedback"""
+        added, rejected = self.service.add_students(
+            split_creds(line.strip()) for line in lines)
+        self.number_added += len(added)
+
+        print(f'Total {self.number_added} students have been added.')
+        for reason, count in rejected.most_common():
+            print(f"{reason.rstrip('.')}: {count}")
 
 
 class AddPoints(Subshell):
     intro = "Enter an id and points or 'back' to return:"
+    streams_input = True
 
     def default(self, line):
         """Attempt to add points and submission counts based on input lines"""
@@ -46,22 +91,67 @@ class AddPoints(Subshell):
             print('Incorrect points format.')
             return
         student_id, *points = points
-        if student_id not in self.student_data:
-            print(f'No student is found for id={student_id}')
+        try:
+            if not self.service.add_student_points(student_id, points):
+                print(f'No student is found for id={student_id}')
+                return
+        except ValueError as error:
+            print(error)
             return
 
-        submissions = (int(bool(x)) for x in points)
-        self.update_list('points', points, student_id)
-        self.update_list('submissions', submissions, student_id)
         print('Points updated.')
 
-    def update_list(self, name, incoming, student_id):
-        if name not in self.student_data[student_id]:
-            self.student_data[student_id][name] = list(incoming)
-        else:
-            self.student_data[student_id][name] = \
-                [old + i for old, i
-                 in zip(self.student_data[student_id][name], incoming)]
+    def import_file(self, path):
+        """Add points from a file of lines in the interactive format,
+        or from stdin up to a 'back' line if path is '-'.
+
+        Lines are parsed a chunk at a time and grouped by student id,
+        so every student gets a single update with summed points and
+        submission counts. Points of all students are added at once,
+        or none of them if any would exceed MAX_POINTS.
+        """
+        incorrect = 0
+        not_found = 0
+        grouped = []
+        try:
+            for chunk in self.read_chunks(path):
+                student_ids, points, slow_rows, chunk_incorrect = \
+                    parse_points_chunk(chunk)
+                incorrect += chunk_incorrect
+                # Ids past int64 or not a number belong to no student
+                rows = [row for row in slow_rows if isinstance(row[0], int)
+                        and INT64.min <= row[0] <= INT64.max]
+                not_found += len(slow_rows) - len(rows)
+                if rows:
+                    table = np.array(rows, dtype=np.int64)
+                    student_ids = np.concatenate((student_ids, table[:, 0]))
+                    points = np.concatenate((points, table[:, 1:]))
+                grouped.append(group_by_student(student_ids, points))
+
+            if len(grouped) > 1:
+                grouped = [group_by_student(*map(np.concatenate, zip(*grouped)))]
+            student_ids, points, submissions, lines = (
+                grouped[0] if grouped else group_by_student(
+                    np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.int64)))
+        except OSError:
+            print(f'Error: cannot read {path}!')
+            return
+        except ValueError as error:  # Points too large, nothing is added
+            print(error)
+            return
+
+        try:
+            known = self.service.add_points(student_ids, points, submissions)
+        except ValueError as error:
+            print(error)
+            return
+
+        not_found += int(lines[~known].sum())
+        print(f'Points updated for {np.count_nonzero(known)} students.')
+        if incorrect:
+            print(f'Incorrect points format: {incorrect}')
+        if not_found:
+            print(f'No student is found: {not_found}')
 
 
 class Find(Subshell):
@@ -74,13 +164,14 @@ class Find(Subshell):
             student_id = int(student_id)
         except ValueError:
             pass
-        if student_id not in self.student_data:
+        points, = self.service.find([student_id])
+        if points is None:
             # Use unchanged user input in feedback
             print(f'No student is found for id={line}.')
             return
 
         print('{} points: Python={}; DSA={}; Databases={}; Flask={}'
-              .format(student_id, *self.student_data[student_id]['points']))
+              .format(student_id, *points))
 
 
 class Stats(Subshell):
@@ -104,6 +195,15 @@ class Stats(Subshell):
     def default(self, _):
         print('Unknown course.')
 
+    def precmd(self, line):
+        """Make the command word lowercase if a corresponding command
+        exists, so 'Python top 1' works as 'PYTHON' does"""
+        command = COMMAND.match(line).group()
+        lower = command.lower()
+        if command and hasattr(self, 'do_' + lower):
+            line = lower + line[len(command):]
+        return line
+
     def do_python(self, arg):
         self.course(0, arg)
 
@@ -116,95 +216,75 @@ class Stats(Subshell):
     def do_flask(self, arg):
         self.course(3, arg)
 
+    def do_rank(self, arg):
+        """Print position of a student in a course: rank <id> <course>"""
+        match arg.split():
+            case [student_id, course_name]:
+                pass
+            case _:
+                self.default(None)
+                return
+
+        courses = [name.lower() for name in COURSE_NAMES]
+        if course_name.lower() not in courses:
+            self.default(None)
+            return
+        course_id = courses.index(course_name.lower())
+        line = student_id
+        try:
+            student_id = int(student_id)
+        except ValueError:
+            pass
+        if student_id not in self.service:
+            print(f'No student is found for id={line}.')
+            return
+
+        rank = self.service.rank(student_id, course_id)
+        if rank is None:
+            print(f'Student {student_id} is not enrolled in '
+                  f'{COURSE_NAMES[course_id]}.')
+            return
+        position, enrolled = rank
+        print(f'{student_id} rank in {COURSE_NAMES[course_id]}: '
+              f'{position} of {enrolled} (top {position / enrolled:.1%})')
+
     def course(self, course_id, arg):
-        match arg:
-            case '':
-                course_intro = self.course_intro(course_id)
-                lines = self.formatted_stats(course_id)
-                print(course_intro)
-                print(*lines, sep='\n')
+        """Print course details: all of them, 'top <n>' students
+        or 'page <n>' of PAGE_SIZE students"""
+        match arg.split():
+            case []:
+                start, stop = 0, None
+            case ['top', n] if n.isdecimal():
+                start, stop = 0, min(int(n), sys.maxsize)
+            case ['page', n] if n.isdecimal() and int(n) > 0:
+                # Past the last page, but within what slices and SQL take
+                page = min(int(n), sys.maxsize // PAGE_SIZE)
+                start = (page - 1) * PAGE_SIZE
+                stop = start + PAGE_SIZE
             case _:
                 self.default(None)
+                return
+
+        self.print_course(course_id, start, stop)
+
+    def print_course(self, course_id, start=0, stop=None):
+        print(self.course_intro(course_id))
+        render.write(self.formatted_stats(course_id, start, stop))
 
     def course_intro(self, course_id):
         course_intro = (COURSE_NAMES[course_id] + "\n"
                         + self.DATA_HEADER.format('id', 'points', 'completed'))
         return course_intro
 
-    def formatted_stats(self, course_id):
-        line_template = self.DATA
-        course_stats = self.course_stats(course_id)
-        lines = [line_template] * len(course_stats)
-        lines = [line.format(*row) for line, row
-                 in zip(lines, course_stats)]
-        return lines
-
-    def course_stats(self, course: int) -> [(int, int, float), ...]:
-        """Return stats of students enrolled in course as a sequence of
-        tuples (id, points, completed) sorted by points, then id."""
-        stats = []
-        for student_id, data in self.student_data.items():
-            points = data['points'][course]
-            if points:  # Student is enrolled in course
-                completed = points / COMPLETE_POINTS[course]
-                entry: tuple = (student_id, points, completed)
-                stats.append(entry)
-
-        stats.sort(key=operator.itemgetter(0))
-        stats.sort(key=operator.itemgetter(1), reverse=True)
-        return stats
+    def formatted_stats(self, course_id, start=0, stop=None,
+                        chunk_rows=render.CHUNK_ROWS):
+        """Yield text of DATA lines of course stats, chunk_rows
+        lines at a time, see render.course_rows"""
+        limit = None if stop is None else max(stop - start, 0)
+        return render.course_rows(
+            self.service.course_rows(course_id, limit, start), chunk_rows)
 
     def intro_stats(self) -> (str | None,) * 6:
         # FIXME?: a course with no submissions can be considered hardest
         #         it passes the Hyperskill test but seems bad.
-
-        # Maybe this can be done elegantly in a loop. Maybe.
-        enrolled_counts = self.magic_sum('submissions', counting_mode=True)
-        submission_counts = self.magic_sum('submissions')
-        total_grades = self.magic_sum('points')
-        average_grades = [(t / s) if s != 0 else 0
-                          for t, s in zip(total_grades, submission_counts)]
-
-        output = []
-        for metric in (enrolled_counts, submission_counts, average_grades):
-            output.extend(self.get_most_and_least(metric))
-        return output
-
-    def magic_sum(self, column: str, counting_mode=False):
-        out = [0] * 4
-        for student in self.student_data.values():
-            field = student[column]
-            if counting_mode:
-                field = [int(bool(n)) for n in field]
-            out = (self.add_values(out, field))
-        return out
-
-    @staticmethod
-    def add_values(sequence_1, sequence_2):
-        return [x + y for x, y in zip(sequence_1, sequence_2)]
-
-    @staticmethod
-    def get_most_and_least(metric) -> (str | None,) * 2:
-        """Return all the "most" courses, and the "least" course
-        if there is exactly one; according to the metric.
-
-        Return (None, None) if metric for all courses is 0.
-
-        Return (most, None) if there is wrong number of least courses,
-        as there can only be one least course.
-        """
-        if metric == [0] * 4:
-            return None, None
-
-        max_value, min_value = max(metric), min(metric)
-        most, least = [], []
-        for i, value in enumerate(metric):
-            if value == max_value:
-                most.append(COURSE_NAMES[i])
-            elif value == min_value:
-                least.append(COURSE_NAMES[i])
-
-        if len(least) != 1:
-            least = [None]
-
-        return ', '.join(most), least[0]
+        return list(self.service.summary().values())
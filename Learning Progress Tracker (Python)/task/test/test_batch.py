@@ -0,0 +1,133 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from base import Subshell
+from batch import Batch
+from constants import MAX_POINTS
+from tracker import Tracker
+
+SCRIPT = '''
+help
+add students
+John Smith jsmith@mail.com
+Jane Doe jdoe@mail.com
+x y
+jane doe jdoe@mail.com
+BACK
+list
+Add Points
+1 10 10 0 5
+2 700 0 0 0
+3 1 1 1 1
+1 x 1 1 1
+back
+add points from -
+1 5 5 5 5
+zz
+back
+find
+1
+nope
+back
+statistics
+python
+DSA top 1
+flask page 1
+python top ²
+python page ²
+rank 2 python
+java
+back
+notify
+notify
+exit
+list
+'''
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        stdin = sys.stdin
+        self.addCleanup(setattr, sys, 'stdin', stdin)
+
+    def test_output_matches_interactive_session(self):
+        sys.stdin = io.StringIO(SCRIPT)
+        with redirect_stdout(io.StringIO()) as interactive:
+            Tracker().cmdloop()
+
+        sys.stdin = io.StringIO(SCRIPT)
+        with redirect_stdout(io.StringIO()) as batch:
+            Batch(Tracker()).run(sys.stdin)
+
+        self.assertEqual(interactive.getvalue(), batch.getvalue())
+        self.assertTrue(batch.getvalue().endswith('Bye!\n'))
+
+
+class ImportTest(unittest.TestCase):
+    POINTS = (b'1 10 0 0 0\n2 5 5 0 0\n3 1 1 1 1\n1 10 0 0 0\nx 1 1 1 1\n'
+              b'1 2\n1 +5 0 0 1\n\n2 0 0 0 7\n')
+
+    def import_file(self, command, name, data: bytes, tracker=None) -> str:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with open(path, 'wb') as file:
+                file.write(data)
+            with redirect_stdout(io.StringIO()) as output:
+                (tracker or Tracker()).onecmd(f'{command} from {path}')
+        return output.getvalue()
+
+    def import_students(self, name, data: bytes) -> str:
+        return self.import_file('add students', name, data)
+
+    def tracker(self) -> Tracker:
+        tracker = Tracker()
+        for i in range(2):
+            tracker.service.add_student({'first name': 'Aa', 'last name': 'Bb',
+                                         'email': f'address{i}@mail.com'})
+        return tracker
+
+    def test_points_summary(self):
+        for chunk_size in (1, 16, Subshell.CHUNK_SIZE):
+            with self.subTest(chunk_size=chunk_size), \
+                    mock.patch.object(Subshell, 'CHUNK_SIZE', chunk_size):
+                tracker = self.tracker()
+                self.assertEqual('Points updated for 2 students.\n'
+                                 'Incorrect points format: 2\n'
+                                 'No student is found: 2\n',
+                                 self.import_file('add points', 'points.txt',
+                                                  self.POINTS, tracker))
+                self.assertEqual([25, 0, 0, 1], tracker.service.find([1])[0])
+                self.assertEqual([5, 5, 0, 7], tracker.service.find([2])[0])
+                self.assertEqual([4, 1, 0, 2], tracker.student_data.totals['submissions'])
+
+    def test_points_past_max_add_nothing(self):
+        half = MAX_POINTS // 2 + 1
+        for data in (f'1 1 0 0 0\n2 {half} 0 0 0\n'
+                     f'2 {half} 0 0 0\n'.encode(),
+                     f'1 1 0 0 0\n2 {MAX_POINTS} 0 0 0\n'.encode()):
+            for chunk_size in (1, Subshell.CHUNK_SIZE):
+                with self.subTest(data=data, chunk_size=chunk_size), \
+                        mock.patch.object(Subshell, 'CHUNK_SIZE', chunk_size):
+                    tracker = self.tracker()
+                    tracker.service.add_student_points(2, [1, 0, 0, 0])
+                    self.assertRegex(self.import_file('add points', 'points.txt',
+                                                      data, tracker),
+                                     f'^Points of .* would exceed {MAX_POINTS}.\n$')
+                    self.assertEqual([[0, 0, 0, 0], [1, 0, 0, 0]],
+                                     tracker.service.find([1, 2]))
+
+    def test_csv_header_and_extension_case(self):
+        data = b'first,last,email\nJohn,Smith,js@mail.com\nJane,Doe,nope\n'
+        self.assertEqual('Total 1 students have been added.\nIncorrect email: 1\n',
+                         self.import_students('students.CSV', data))
+        self.assertEqual('Total 1 students have been added.\nIncorrect email: 1\n',
+                         self.import_students('students.tsv', data.replace(b',', b'\t')))
+
+    def test_undecodable_file_is_reported(self):
+        output = self.import_students('students.txt', b'John Smith js@mail.com\n\xff\xfe\n')
+        self.assertTrue(output.startswith('Error: cannot read '), output)
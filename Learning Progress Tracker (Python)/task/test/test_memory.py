@@ -0,0 +1,49 @@
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import memory
+from store import STORES
+from test.test_store import fill
+from tracker import Tracker
+
+
+class MemoryTest(unittest.TestCase):
+    def test_shared_objects_count_once(self):
+        shared = list(range(1000))
+        seen = set()
+        first = memory.deep_size([shared], seen=seen)
+        second = memory.deep_size([shared], seen=seen)
+        self.assertGreater(first, memory.deep_size(shared))
+        self.assertLess(second, 100)
+
+    def test_components_grow_with_students(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                small = fill(store_class(), students=100, updates=100).memory()
+                large = fill(store_class(), students=5000, updates=5000).memory()
+                self.assertEqual(small.keys(), large.keys())
+                self.assertGreater(sum(large.values()), 10 * sum(small.values()))
+
+    def test_trace_shows_store_growth(self):
+        tracker = Tracker()
+        with redirect_stdout(io.StringIO()) as output:
+            tracker.onecmd('memory trace add students from /nonexistent.csv')
+        self.assertTrue(output.getvalue().startswith(
+            'Error: cannot read /nonexistent.csv!\nMemory grown by line:'))
+        with memory.traced() as growth:
+            fill(tracker.student_data, students=2000, updates=0)
+        files = {os.path.basename(stat.traceback[0].filename) for stat in growth}
+        self.assertIn('store.py', files)
+
+    def test_trace_refuses_exit_and_back(self):
+        stdin = io.StringIO('memory trace exit\nmemory trace  back\nlist\nexit\n')
+        with mock.patch.object(sys, 'stdin', stdin), \
+                redirect_stdout(io.StringIO()) as output:
+            Tracker(STORES['sqlite']()).cmdloop()
+        self.assertEqual('Learning Progress Tracker\n'
+                         + 'Error: unknown command!\n' * 2
+                         + 'No students found.\nBye!\n', output.getvalue())
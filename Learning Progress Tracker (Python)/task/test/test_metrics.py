@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from base import Maim
+from batch import Batch
+from metrics import Histogram, Metrics
+from tracker import Tracker
+
+SCRIPT = '''add students
+John Smith jsmith@mail.com
+x y
+back
+add points
+1 10 10 0 5
+1 x
+back
+statistics
+python
+dsa top 1
+
+back
+metrics
+exit
+'''
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        stdin = sys.stdin
+        self.addCleanup(setattr, sys, 'stdin', stdin)
+        self.addCleanup(setattr, Maim, 'metrics', None)
+
+    def record(self, run) -> dict:
+        Maim.metrics = Metrics()
+        sys.stdin = io.StringIO(SCRIPT)
+        with redirect_stdout(io.StringIO()):
+            run()
+        return {key: (histogram.count, histogram.output)
+                for key, histogram in Maim.metrics.histograms.items()}
+
+    def test_interactive_and_batch_record_the_same(self):
+        interactive = self.record(lambda: Tracker().cmdloop())
+        batch = self.record(lambda: Batch(Tracker()).run(sys.stdin))
+        self.assertEqual(interactive.keys(), batch.keys())
+        for key in ('AddStudents.default', 'AddPoints.default', 'Stats.python',
+                    'Stats.dsa', 'Stats.emptyline', 'Tracker.metrics'):
+            self.assertEqual(interactive[key], batch[key])
+        self.assertEqual(2, batch['AddStudents.default'][0])
+        self.assertEqual(len('Points updated.\nIncorrect points format.\n'),
+                         batch['AddPoints.default'][1])
+
+    def test_percentiles_are_bucket_bounds(self):
+        histogram = Histogram()
+        for seconds in [1e-6] * 90 + [1e-3] * 10:
+            histogram.add(seconds, 0)
+        self.assertTrue(1e-6 < histogram.percentile(50) < 1.2e-6)
+        self.assertTrue(1e-3 < histogram.percentile(95) < 1.2e-3)
+
+    def test_export(self):
+        self.record(lambda: Batch(Tracker()).run(sys.stdin))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            Maim.metrics.export(path)
+            with open(path) as file:
+                exported = json.load(file)
+        commands = exported['commands']
+        self.assertEqual(len(exported['bucket lower bounds']),
+                         len(commands['Tracker.add']['counts']))
+        self.assertEqual(2, sum(commands['Tracker.add']['counts']))
+
+    def test_off_by_default(self):
+        with redirect_stdout(io.StringIO()) as output:
+            Tracker().onecmd('metrics')
+        self.assertIn('Metrics are off', output.getvalue())
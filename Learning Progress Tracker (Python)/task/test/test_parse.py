@@ -0,0 +1,44 @@
+import unittest
+
+from constants import MAX_POINTS
+from parse import parse_points, parse_points_chunk
+
+LINES = [
+    '1 10 10 0 5', ' 2\t1 2 3 4 ', '0001 01 0 0 0', '1 +5 0 0 0', '1 1_0 0 0 0',
+    '1 -1 0 0 0', '1 ² 0 0 0', '1 ５ 0 0 0', '٣ 1 2 3 4', 'x 1 1 1 1',
+    f'1 {"9" * 18} 0 0 0', f'1 {"9" * 19} 0 0 0', f'1 {MAX_POINTS} 0 0 0',
+    f'1 {MAX_POINTS + 1} 0 0 0', f'{"9" * 25} 1 1 1 1', '1 1 1 1', '1 1 1 1 1 1',
+    '', '   ', 'back now', '1 1.5 0 0 0',
+]
+
+
+class ParseTest(unittest.TestCase):
+    def test_chunk_matches_line_by_line(self):
+        student_ids, points, slow, incorrect = parse_points_chunk(LINES)
+        chunked = [(student_id, *row) for student_id, row
+                   in zip(student_ids.tolist(), points.tolist())] + slow
+        expected = [parse_points(line) for line in LINES]
+        self.assertEqual(sorted(map(repr, filter(None, expected))),
+                         sorted(map(repr, chunked)))
+        self.assertEqual(expected.count(None), incorrect)
+
+    def test_each_line_alone(self):
+        for line in LINES:
+            with self.subTest(line=line):
+                student_ids, points, slow, incorrect = parse_points_chunk([line])
+                chunked = [(student_id, *row) for student_id, row
+                           in zip(student_ids.tolist(), points.tolist())] + slow
+                expected = parse_points(line)
+                self.assertEqual([] if expected is None else [expected], chunked)
+                self.assertEqual(expected is None, incorrect == 1)
+
+    def test_values(self):
+        self.assertEqual((1, 5, 10, 0, 0), parse_points('1 +5 1_0 0 0'))
+        self.assertEqual((3, 5, 0, 0, 0), parse_points('٣ ５ 0 0 0'))
+        self.assertEqual(('x', 1, 1, 1, 1), parse_points('x 1 1 1 1'))
+        for line in ('', '1 ² 0 0 0', f'1 {MAX_POINTS + 1} 0 0 0', '1 1 1 1'):
+            self.assertIsNone(parse_points(line), line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import os
+import runpy
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from reader import BlockReader
+from tracker import Tracker
+
+SCRIPT = '''add students
+John Smith jsmith@mail.com
+Jane Doe jane@mail.com
+John Smith jsmith@mail.com
+
+  BACK
+BACK now
+back,now
+Back2 Back b@mail.com
+?
+help
+exit
+!x
+Ann Lee ann@mail.com\r
+BACK
+add points
+1 10 10 0 5
+2 1 2 3 4 \t
+3 1 1 1 1
+x 1 1 1 1
+1 -1 0 0 0
+exit
+Back now
+ back
+add points from -
+1 1 1 1 1
+2 x
+back
+list
+add students
+Émile Zola emile@mail.com
+back
+find
+1
+back
+exit
+'''
+
+
+def run(stdin) -> str:
+    with mock.patch.object(sys, 'stdin', stdin), \
+            redirect_stdout(io.StringIO()) as output:
+        Tracker().cmdloop()
+    return output.getvalue()
+
+
+class ReaderTest(unittest.TestCase):
+    def test_piped_sessions_match_line_by_line(self):
+        expected = run(io.StringIO(SCRIPT, newline=None))
+        self.assertIn('Total 3 students have been added.', expected)
+        for block_size in (1, 7, 1 << 16):
+            with self.subTest(block_size=block_size), \
+                    mock.patch.object(BlockReader, 'BLOCK_SIZE', block_size):
+                self.assertEqual(
+                    expected, run(BlockReader(io.BytesIO(SCRIPT.encode()))))
+
+    def test_lines_and_iteration_share_position(self):
+        reader = BlockReader(io.BytesIO(b'a\r\nb\rc\n\nd'))
+        lines = reader.lines()
+        self.assertEqual('a', next(lines))
+        self.assertEqual('b\n', reader.readline())
+        self.assertEqual(['c', ''], [next(lines), next(lines)])
+        self.assertEqual(['d'], list(reader))
+        self.assertEqual('', reader.readline())
+
+    def test_main_leaves_swapped_stdin_alone(self):
+        class Lines:
+            def __init__(self, text):
+                self.readline = io.StringIO(text).readline
+
+        main = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'main.py')
+        for stdin in io.StringIO('list\nexit\n'), Lines('list\nexit\n'):
+            with self.subTest(stdin=type(stdin).__name__), \
+                    mock.patch.object(sys, 'argv', [main]), \
+                    mock.patch.object(sys, 'stdin', stdin), \
+                    redirect_stdout(io.StringIO()) as output:
+                runpy.run_path(main, run_name='__main__')
+                self.assertIs(stdin, sys.stdin)
+            self.assertEqual('Learning Progress Tracker\nNo students found.\nBye!\n',
+                             output.getvalue())
@@ -0,0 +1,82 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import render
+import snapshot
+from store import STORES
+from subshells import Stats
+from test.test_store import fill
+from tracker import Tracker
+
+
+def old_course_text(stats, course_id, start=0, stop=None):
+    """Text printed by Stats.print_course before rows were rendered in bulk"""
+    limit = None if stop is None else max(stop - start, 0)
+    lines = [stats.DATA.format(*row)
+             for row in stats.service.course_table(course_id, limit, start)]
+    return '\n'.join(lines) + '\n'
+
+
+def printed(call, *args) -> str:
+    with redirect_stdout(io.StringIO()) as output:
+        call(*args)
+    return output.getvalue()
+
+
+class RenderTest(unittest.TestCase):
+    RANGES = ((0, None), (0, 10), (0, 0), (7, 1500), (1990, None), (5000, 5010))
+
+    def assert_renders_as_before(self, store):
+        stats = Stats(Tracker(store).service.view())
+        for course_id in range(4):
+            for start, stop in self.RANGES:
+                with self.subTest(course=course_id, start=start, stop=stop):
+                    expected = old_course_text(stats, course_id, start, stop)
+                    text = printed(stats.print_course, course_id, start, stop)
+                    self.assertEqual(stats.course_intro(course_id) + '\n' + expected,
+                                     text)
+                    self.assertEqual(expected, ''.join(stats.formatted_stats(
+                        course_id, start, stop, chunk_rows=100)))
+
+    def test_course_rows_match_per_row_format(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                self.assert_renders_as_before(fill(store_class()))
+
+    def test_snapshot_course_rows_match_per_row_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot')
+            snapshot.save(fill(STORES['dict']()), path)
+            self.assert_renders_as_before(snapshot.load(path, read_only=True))
+
+    def test_huge_numbers_and_case_of_commands(self):
+        huge = '9' * 20
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                stats = Stats(Tracker(fill(store_class())).service.view())
+                run = lambda line: printed(stats.onecmd, stats.precmd(line))
+                top = run('python')
+                self.assertEqual(top, run(f'python top {huge}'))
+                self.assertEqual(stats.course_intro(0) + '\n\n',
+                                 run(f'python page {huge}'))
+                self.assertEqual(run('python top 1'), run('Python top 1'))
+                self.assertEqual(run('rank 1 python'), run('Rank 1 python'))
+                self.assertNotIn('Unknown course.', run('Rank 1 python'))
+
+    def test_list(self):
+        tracker = Tracker(fill(STORES['dict'](), students=25_000, updates=0))
+        self.assertEqual('Students:\n' + '\n'.join(map(str, range(1, 25_001))) + '\n',
+                         printed(tracker.onecmd, 'list'))
+
+    def test_binary_buffer_keeps_order(self):
+        binary = io.BytesIO()
+        stdout = io.TextIOWrapper(binary, encoding='utf-8')
+        with redirect_stdout(stdout):
+            print('before')
+            render.write(render.lines(range(3), size=2))
+            print('after')
+        stdout.flush()
+        self.assertEqual(b'before\n0\n1\n2\nafter\n', binary.getvalue())
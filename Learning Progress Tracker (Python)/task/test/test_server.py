@@ -0,0 +1,92 @@
+import asyncio
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import server
+from base import Maim
+from batch import Batch
+from metrics import Metrics
+from server import Server
+from service import TrackerService
+from tracker import Tracker
+
+SCRIPT = '''add students
+John Smith jsmith@mail.com
+Jane Doe jdoe@mail.com
+x y
+back
+Add Points
+1 700 10 0 5
+2 10 0 0 0
+3 1 1 1 1
+back
+find
+1
+back
+statistics
+python
+python top 1
+rank 2 python
+back
+notify
+list
+'''
+
+
+async def session(port, script):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(script.encode())  # All at once, as a pipelining client
+    await writer.drain()
+    output = await reader.read()
+    writer.close()
+    return output.decode()
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = TrackerService()
+        self.server = await Server(self.service).serve()
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_output_matches_batch(self):
+        with redirect_stdout(io.StringIO()) as expected:
+            Batch(Tracker()).run(io.StringIO(SCRIPT + 'exit\n'))
+
+        output = await session(self.port, SCRIPT + 'exit\nlist\n')
+        self.assertEqual(expected.getvalue(), output)
+
+    async def test_clients_share_students(self):
+        await session(self.port, 'add students\nJohn Smith js@mail.com\nback\nexit\n')
+        outputs = await asyncio.gather(*(
+            session(self.port, 'add students\nJohn Smith js@mail.com\nback\nlist\nexit\n')
+            for _ in range(10)))
+        for output in outputs:
+            self.assertIn('This email is already taken.', output)
+            self.assertIn('Students:\n1\n', output)
+        self.assertEqual(1, len(self.service))
+
+    async def test_long_course_table_is_streamed(self):
+        self.service.add_students(
+            {'first name': 'Aa', 'last name': 'Bb', 'email': f'address{i}@mail.com'}
+            for i in range(2 * server.STREAM_ROWS + 1))
+        self.service.add_points(range(1, 2 * server.STREAM_ROWS + 2),
+                                [[i, 0, 0, 0] for i in range(2 * server.STREAM_ROWS + 1)])
+        script = 'statistics\npython\nback\nexit\n'
+        with redirect_stdout(io.StringIO()) as expected:
+            Batch(Tracker(self.service.student_data)).run(io.StringIO(script))
+
+        output = await session(self.port, script)
+        self.assertEqual(expected.getvalue(), output)
+
+    async def test_files_are_off_limits(self):
+        self.addCleanup(setattr, Maim, 'metrics', None)
+        Maim.metrics = Metrics()
+        output = await session(self.port, 'add points from -\ncheckpoint to /tmp\n'
+                                          'metrics to /tmp/metrics.json\nexit\n')
+        self.assertEqual('Learning Progress Tracker\n'
+                         + 'Error: unknown command!\n' * 3 + 'Bye!\n', output)
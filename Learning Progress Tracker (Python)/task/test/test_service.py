@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from service import TrackerService
+from store import STORES
+
+
+def creds(i):
+    return {'first name': 'Aa', 'last name': 'Bb', 'email': f'address{i}@mail.com'}
+
+
+class ServiceTest(unittest.TestCase):
+    def test_add_students_rejects_as_add_student(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                service = TrackerService(store_class())
+                self.assertEqual(1, service.add_student(creds(0)))
+                with self.assertRaisesRegex(ValueError, 'already taken'):
+                    service.add_student(creds(0))
+                added, rejected = service.add_students(
+                    [creds(0), creds(1), creds(1), None,
+                     {**creds(2), 'email': 'nope'}, creds(3)])
+                self.assertEqual([2, 3], added)
+                self.assertEqual({'This email is already taken.': 2,
+                                  'Incorrect credentials': 1,
+                                  'Incorrect email.': 1}, rejected)
+
+    def test_bulk_points_match_single_updates(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                single, bulk = TrackerService(store_class()), TrackerService(store_class())
+                for service in single, bulk:
+                    service.add_students(creds(i) for i in range(3))
+                student_ids = [1, 3, 1, 7, 2]
+                points = np.array([[5, 0, 0, 1], [0, 9, 9, 0], [600, 0, 0, 0],
+                                   [1, 1, 1, 1], [0, 0, 0, 0]])
+                for student_id, row in zip(student_ids, points.tolist()):
+                    single.add_student_points(student_id, row)
+                found = bulk.add_points(student_ids, points)
+
+                self.assertEqual([True, True, True, False, True], found.tolist())
+                self.assertEqual(single.find([1, 2, 3, 7]), bulk.find([1, 2, 3, 7]))
+                self.assertIsNone(bulk.find([7])[0])
+                self.assertEqual(single.course_table(0), bulk.course_table(0))
+                self.assertEqual(single.summary(), bulk.summary())
+                self.assertEqual([(1, 0)], bulk.pending_notifications())
+                self.assertEqual([], bulk.pending_notifications())
+
+    def test_course_table_limit_and_offset(self):
+        service = TrackerService()
+        service.add_students(creds(i) for i in range(10))
+        service.add_points(range(1, 11), [[i, 0, 0, 0] for i in range(10)])
+        table = service.course_table(0)
+        self.assertEqual(9, len(table))
+        self.assertEqual(table[:3], service.course_table(0, 3))
+        self.assertEqual(table[4:6], service.course_table(0, 2, 4))
+        self.assertEqual(table[8:], service.course_table(0, None, 8))
@@ -0,0 +1,443 @@
+import copy
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+import snapshot
+from constants import MAX_POINTS
+from store import (STORES, ColumnarStore, DictStore, ProcessStore, ShardedStore,
+                   SqliteStore, group_by_student)
+from wal import MAGIC, POINTS_RECORD, Log
+
+
+def fill(store, students=2000, updates=10000, seed=0):
+    rng = random.Random(seed)
+    student_ids = [store.add_student({'email': f'address{i}@mail.com',
+                                      'first name': 'Aa', 'last name': 'Bb'})
+                   for i in range(students)]
+    for _ in range(updates):
+        points = [rng.choice((0, 0, rng.randint(1, 50))) for _ in range(4)]
+        store.add_points(rng.choice(student_ids), points)
+    return store
+
+
+class StoreTest(unittest.TestCase):
+    def test_ids_are_unique_and_stable(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = fill(store_class(), updates=0)
+                self.assertEqual(list(range(1, 2001)), list(store))
+                self.assertTrue(store.email_taken('address1999@mail.com'))
+                self.assertFalse(store.email_taken('address2000@mail.com'))
+
+    def test_totals_match_full_scan(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                self.assertTrue(fill(store_class()).check_totals())
+
+    def test_totals_exceed_int64(self):
+        big = 2 ** 62 + 1
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = fill(store_class(), students=3, updates=0)
+                store.add_points_bulk([1, 2], np.full((2, 4), big),
+                                      np.ones((2, 4), dtype=np.int64))
+                store.add_points(3, [big, 0, 0, 0])
+                self.assertEqual([3 * big, 2 * big, 2 * big, 2 * big],
+                                 store.totals['points'])
+                self.assertTrue(store.check_totals())
+                if isinstance(store, SqliteStore):
+                    self.assertEqual(store.totals, SqliteStore(
+                        store.path, connection=store.connection).totals)
+
+    def test_course_stats_match_sorted_scan(self):
+        for name, store_class in STORES.items():
+            store = fill(store_class())
+            for course in range(4):
+                with self.subTest(store=name, course=course):
+                    expected = sorted(
+                        ((student_id, store.points(student_id)[course])
+                         for student_id in store
+                         if store.points(student_id)[course]),
+                        key=lambda entry: (-entry[1], entry[0]))
+                    self.assertEqual(expected, [
+                        (student_id, points) for student_id, points, _
+                        in store.course_stats(course)])
+
+    def test_course_stats_slices(self):
+        for name, store_class in STORES.items():
+            store = fill(store_class())
+            full = store.course_stats(0)
+            for start, stop in ((0, 5), (0, 0), (1000, 1700), (3, None),
+                                (len(full) - 2, len(full) + 10), (5000, 5020)):
+                with self.subTest(store=name, start=start, stop=stop):
+                    self.assertEqual(full[start:stop],
+                                     store.course_stats(0, start, stop))
+
+    def test_rank_matches_position(self):
+        for name, store_class in STORES.items():
+            store = fill(store_class())
+            for course in range(4):
+                with self.subTest(store=name, course=course):
+                    for position, (student_id, *_) in enumerate(
+                            store.course_stats(course), start=1):
+                        self.assertEqual(
+                            (position, store.totals['enrolled'][course]),
+                            store.rank(student_id, course))
+            student_id = store.add_student({'email': 'new@mail.com',
+                                            'first name': 'Aa', 'last name': 'Bb'})
+            self.assertIsNone(store.rank(student_id, 0))
+
+    def test_completion_queue_matches_scan(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = fill(store_class(), students=100, updates=0)
+                rng = np.random.default_rng(0)
+                for _ in range(5):
+                    for student_id in range(1, 101, 3):
+                        store.add_points(student_id, rng.integers(0, 200, 4).tolist())
+                    points = rng.integers(0, 200, (50, 4))
+                    store.add_points_bulk(list(range(51, 101)), points,
+                                          (points != 0).astype(np.int64))
+                    sent = set(store.sent_notifications())
+                    expected = [pair for pair in store.completed()
+                                if pair not in sent]
+                    pending = store.pending_completions()
+                    self.assertEqual(expected, pending)
+                    for student_id, course in pending:
+                        self.assertTrue(store.mark_sent(student_id, course))
+                self.assertEqual(list(store.completed()),
+                                 store.sent_notifications())
+
+    def test_view_ignores_later_writes(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = fill(store_class(), students=500, updates=2000)
+                if store.view() is store:
+                    continue
+                expected = [store.course_stats(course) for course in range(4)]
+                totals = copy.deepcopy(store.totals)
+                ranks = [store.rank(student_id, 1) for student_id in store]
+                view = store.view()
+                store.add_students({'email': f'late{i}@mail.com', 'first name': 'Aa',
+                                    'last name': 'Bb'} for i in range(100))
+                rng = random.Random(1)
+                for _ in range(1000):
+                    store.add_points(rng.randint(1, 600),
+                                     [rng.choice((0, rng.randint(1, 50))) for _ in range(4)])
+                for student_id in range(1, 501, 7):
+                    store.add_points(student_id, [50, 0, 10, 700])
+                store.add_points_bulk([3, 4], np.full((2, 4), 100), np.ones((2, 4), dtype=np.int64))
+
+                self.assertEqual(expected, [view.course_stats(course) for course in range(4)])
+                self.assertEqual(totals, view.totals)
+                self.assertEqual(ranks, [view.rank(student_id, 1) for student_id in view])
+                self.assertEqual(500, len(view))
+                self.assertNotIn(501, view)
+                self.assertTrue(store.check_totals())
+                del view
+                self.assertFalse(store.views)
+
+    def test_sqlite_file_view_ignores_writes_while_reading(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = fill(SqliteStore(os.path.join(directory, 'tracker.db')),
+                         students=500, updates=2000)
+            expected = store.course_stats(0)
+            view = store.view()
+            rows = view.iter_course_stats(0)
+            read = [next(rows) for _ in range(10)]
+            for student_id in range(1, 501):
+                store.add_points(student_id, [student_id, 0, 0, 0])
+            store.commit()
+            self.assertEqual(expected, read + list(rows))
+            self.assertEqual(expected, view.course_stats(0))
+            self.assertNotEqual(expected, store.view().course_stats(0))
+            store.close()
+
+    def test_sqlite_memory_file_goes_with_store_and_views(self):
+        store = fill(SqliteStore(), students=50, updates=100)
+        view = store.view()
+        self.assertEqual(store.totals, view.totals)
+        self.assertIsNot(store.totals['points'], view.totals['points'])
+        directory = store.directory.name
+        store.close()
+        del store
+        self.assertTrue(view.course_stats(0))
+        del view
+        self.assertFalse(os.path.exists(directory))
+
+    def test_stores_agree(self):
+        stores = [fill(store_class()) for store_class in STORES.values()]
+        reference, *others = stores
+        for store in others:
+            self.assertEqual(list(reference), list(store))
+            for course in range(4):
+                self.assertEqual(reference.course_stats(course),
+                                 store.course_stats(course))
+            self.assertEqual(list(reference.completed()),
+                             list(store.completed()))
+
+
+class ColumnarStoreTest(unittest.TestCase):
+    def test_matches_dict_store(self):
+        columnar, reference = ColumnarStore(capacity=1), DictStore()
+        for store in columnar, reference:
+            fill(store, students=300, updates=1000)
+            points = np.arange(40).reshape(10, 4)
+            store.add_points_bulk(list(range(5, 15)), points, (points != 0).astype(np.int64))
+        self.assertEqual(list(range(1, 301)), list(columnar))
+        self.assertEqual(300, len(columnar))
+        self.assertIn(300, columnar)
+        self.assertNotIn(301, columnar)
+        self.assertNotIn('1', columnar)
+        self.assertGreaterEqual(len(columnar.points_array), 300)
+        self.assertEqual(reference.totals, columnar.totals)
+        self.assertTrue(columnar.check_totals())
+        self.assertEqual(list(reference.completed()), list(columnar.completed()))
+        self.assertEqual(reference.pending_completions(), columnar.pending_completions())
+        for student_id in 1, 7, 300:
+            self.assertEqual(reference.student(student_id), columnar.student(student_id))
+            self.assertEqual(reference.points(student_id), columnar.points(student_id))
+        for course in range(4):
+            self.assertEqual(reference.course_stats(course), columnar.course_stats(course))
+            self.assertEqual([reference.rank(i, course) for i in reference],
+                             [columnar.rank(i, course) for i in columnar])
+        for expected, column in zip(reference.columns(), columnar.columns()):
+            self.assertEqual(np.asarray(expected).tolist(), np.asarray(column).tolist())
+
+
+class ProcessStoreTest(unittest.TestCase):
+    def test_failed_write_is_raised_by_next_read(self):
+        store = fill(ProcessStore(workers=2), students=10, updates=0)
+        store.add_points(4, [1, 0, 0, 0])
+        store.send(0, 'add_points', 99, [1, 0, 0, 0])  # No such student
+        with self.assertRaises(KeyError):
+            store.column_sum('points')
+        self.assertEqual([1, 0, 0, 0], store.points(4))
+        store.send(1, 'add_points', 99, [1, 0, 0, 0])
+        with self.assertRaises(KeyError):
+            store.points(3)
+        self.assertEqual([0, 0, 0, 0], store.points(3))
+        self.assertTrue(store.check_totals())
+        store.close()
+
+
+class ShardedStoreTest(unittest.TestCase):
+    def setUp(self):
+        # Switch threads often, so unsynchronized updates would collide
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-5)
+
+    def test_no_lost_updates(self):
+        store = fill(ShardedStore(shards=8), students=200, updates=0)
+        rng = np.random.default_rng(0)
+        workloads = [(rng.integers(1, 201, 3000), rng.integers(0, 20, (3000, 4)))
+                     for _ in range(8)]
+        completions = []
+        done = threading.Event()
+
+        def write(student_ids, points):
+            for student_id, row in zip(student_ids.tolist(), points.tolist()):
+                store.add_points(student_id, row)
+
+        def notify():
+            while not done.is_set():
+                with store.reading():
+                    completions.extend(store.pending_completions())
+                    self.assertTrue(store.check_totals())
+
+        writers = [threading.Thread(target=write, args=workload)
+                   for workload in workloads]
+        reader = threading.Thread(target=notify)
+        for thread in (*writers, reader):
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        reader.join()
+        completions.extend(store.pending_completions())
+
+        expected = np.zeros((201, 4), dtype=np.int64)
+        for student_ids, points in workloads:
+            np.add.at(expected, student_ids, points)
+        for student_id in store:
+            self.assertEqual(expected[student_id].tolist(), store.points(student_id))
+        self.assertTrue(store.check_totals())
+        self.assertEqual(list(store.completed()), sorted(completions))
+        for course in range(4):
+            self.assertEqual(
+                sorted(((int(-expected[i, course]), i) for i in range(1, 201)
+                        if expected[i, course])),
+                [(-points, student_id) for student_id, points, _
+                 in store.course_stats(course)])
+
+
+class LogTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tracker.log')
+
+    def logged_store(self, store_class, durability='batch'):
+        store = store_class()
+        store.log = Log(self.path, durability)
+        fill(store, students=300, updates=2000)
+        store.mark_sent(5, 2)
+        store.log.close()
+        return store
+
+    def test_replay_restores_state(self):
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = self.logged_store(store_class)
+                replayed = store_class()
+                log = Log(self.path)
+                log.replay(replayed)
+                log.close()
+                self.assertEqual([(5, 2)], replayed.sent_notifications())
+                self.assertEqual(list(store), list(replayed))
+                self.assertEqual(store.totals, replayed.totals)
+                for course in range(4):
+                    self.assertEqual(store.course_stats(course),
+                                     replayed.course_stats(course))
+                self.assertEqual(store.next_id, replayed.next_id)
+                os.remove(self.path)
+
+    def test_long_names_are_logged(self):
+        creds = {'email': 'long@mail.com', 'first name': 'Aa', 'last name': 'B' * 70_000}
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = store_class()
+                store.log = Log(self.path)
+                student_id = store.add_student(creds)
+                store.log.close()
+                replayed = store_class()
+                log = Log(self.path)
+                log.replay(replayed)
+                log.close()
+                self.assertEqual(creds, replayed.student(student_id))
+                os.remove(self.path)
+
+    def test_unloggable_students_are_not_added(self):
+        store = STORES['dict']()
+        store.log = Log(self.path)
+        with self.assertRaises(UnicodeEncodeError):
+            store.add_student({'email': 'x@mail.com', 'first name': 'Aa',
+                               'last name': '\ud800'})
+        self.assertFalse(store.email_taken('x@mail.com'))
+        self.assertEqual(1, store.add_student(
+            {'email': 'x@mail.com', 'first name': 'Aa', 'last name': 'Bb'}))
+        store.log.close()
+
+    def test_torn_record_is_dropped(self):
+        store = self.logged_store(STORES['dict'], durability='always')
+        with open(self.path, 'ab') as file:
+            file.write(b'\x02\x01\x00')
+        replayed = STORES['dict']()
+        log = Log(self.path)
+        log.replay(replayed)
+        log.close()
+        self.assertEqual(store.totals, replayed.totals)
+        self.assertEqual(len(store) + 1, replayed.next_id)
+
+    def test_batch_is_synced_in_time_without_more_records(self):
+        log = Log(self.path, 'batch')
+        self.addCleanup(log.close)
+        log.BATCH_SECONDS = 0.05
+        log.add_points(1, [1, 2, 3, 4], [1, 1, 1, 1])
+        self.assertEqual(len(MAGIC), os.path.getsize(self.path))
+        time.sleep(0.5)
+        self.assertEqual(len(MAGIC) + POINTS_RECORD.size, os.path.getsize(self.path))
+
+    def test_overflowing_points_are_rejected_before_logging(self):
+        big = 5_000_000_000
+        for name, store_class in STORES.items():
+            with self.subTest(store=name):
+                store = store_class()
+                store.log = Log(self.path, 'always')
+                fill(store, students=3, updates=0)
+                store.add_points(1, [big, 0, 0, 1])
+                with self.assertRaisesRegex(ValueError, 'would exceed'):
+                    store.add_points(1, [MAX_POINTS - big + 1, 0, 0, 0])
+                with self.assertRaisesRegex(ValueError, 'would exceed'):
+                    store.add_points_bulk([2, 1], np.array([[1, 0, 0, 0], [0, 0, 0, MAX_POINTS]]),
+                                          np.ones((2, 4), dtype=np.int64))
+                with self.assertRaisesRegex(ValueError, 'would exceed'):
+                    group_by_student(np.array([3, 3]), np.full((2, 4), MAX_POINTS // 2 + 1))
+                self.assertEqual([big, 0, 0, 1], store.points(1))
+                self.assertEqual([0, 0, 0, 0], store.points(2))
+                self.assertTrue(store.check_totals())
+                store.log.close()
+                replayed = store_class()
+                log = Log(self.path)
+                log.replay(replayed)
+                log.close()
+                self.assertEqual(store.totals, replayed.totals)
+                self.assertEqual([big, 0, 0, 1], replayed.points(1))
+                os.remove(self.path)
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'snapshot')
+
+    def test_load_matches_saved_store(self):
+        for name, store_class in STORES.items():
+            for read_only in (False, True):
+                with self.subTest(store=name, read_only=read_only):
+                    store = fill(store_class())
+                    store.mark_sent(3, 1)
+                    snapshot.save(store, self.path)
+                    loaded = snapshot.load(self.path, read_only)
+                    self.assertEqual([(3, 1)], loaded.sent_notifications())
+                    self.assertEqual(list(store), list(loaded))
+                    self.assertTrue(loaded.check_totals())
+                    self.assertEqual(store.student(7)['email'],
+                                     loaded.student(7)['email'])
+                    for course in range(4):
+                        self.assertEqual(store.course_stats(course),
+                                         loaded.course_stats(course))
+                        self.assertEqual(store.course_stats(course, 10, 30),
+                                         loaded.course_stats(course, 10, 30))
+                        self.assertEqual(store.rank(42, course),
+                                         loaded.rank(42, course))
+
+    def test_course_order_past_int64(self):
+        store = fill(STORES['dict'](), students=3, updates=0)
+        store.add_points(1, [2 ** 62, 1, 5, 0])
+        store.add_points(2, [1, 5, 5, 0])
+        store.add_points(3, [1, 5, 5, 0])
+        snapshot.save(store, self.path)
+        loaded = snapshot.load(self.path, read_only=True)
+        for course in range(4):
+            for start, stop in ((0, None), (0, 1), (0, 2), (1, 2), (2, 2)):
+                with self.subTest(course=course, start=start, stop=stop):
+                    self.assertEqual(store.course_stats(course, start, stop),
+                                     loaded.course_stats(course, start, stop))
+
+    def test_loaded_store_keeps_working(self):
+        store = fill(STORES['columnar']())
+        snapshot.save(store, self.path)
+        loaded = snapshot.load(self.path)
+        for changed in (store, loaded):
+            changed.add_points(5, [10, 0, 0, 1])
+            changed.add_student({'email': 'new@mail.com',
+                                 'first name': 'Aa', 'last name': 'Bb'})
+        self.assertTrue(loaded.email_taken('address5@mail.com'))
+        self.assertEqual(store.totals, loaded.totals)
+        self.assertEqual(store.course_stats(0), loaded.course_stats(0))
+        self.assertEqual(list(store), list(loaded))
+        reloaded = snapshot.load(self.path)
+        self.assertEqual(len(store) - 1, len(reloaded))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,49 +1,101 @@
+import re
+
+import memory
+import render
 from base import Maim
-from constants import COMPLETE_POINTS, COURSE_NAMES
+from constants import COURSE_NAMES
+from service import TrackerService
+from store import Store
 from subshells import AddStudents, AddPoints, Find, Stats
 
 
 class Tracker(Maim):
     intro = 'Learning Progress Tracker'
 
-    def __init__(self):
-        self.student_data = {}
-        self.sent_notifications = set()
+    def __init__(self, student_data: Store = None):
+        self.service = TrackerService(student_data)
         super().__init__()
 
     def do_add(self, arg):
-        match arg:
-            case 'students':
-                AddStudents(self.student_data).cmdloop()
-            case 'points':
-                AddPoints(self.student_data).cmdloop()
+        match arg.split(maxsplit=2):
+            case ['students']:
+                self.enter(AddStudents(self.service))
+            case ['students', 'from', path]:
+                AddStudents(self.service).import_file(path)
+            case ['points']:
+                self.enter(AddPoints(self.service))
+            case ['points', 'from', path]:
+                AddPoints(self.service).import_file(path)
             case _:
                 self.default(arg)
 
     def do_find(self, arg):
         match arg:
             case '':
-                Find(self.student_data).cmdloop()
+                self.enter(Find(self.service))
             case _:
                 self.default(arg)
 
     def do_statistics(self, arg):
         match arg:
             case '':
-                Stats(self.student_data).cmdloop()
+                self.enter(Stats(self.service.view()))
             case _:
                 self.default(arg)
 
     def do_list(self, arg):
-        match arg, self.student_data:
-            case '', data if data:
+        match arg, self.service:
+            case '', service if service:
                 print('Students:')
-                print(*data, sep='\n')
+                render.write(render.lines(service.students()))
             case '', _:
                 print('No students found.')
             case _:
                 self.default(arg)
 
+    def do_checkpoint(self, arg):
+        match arg.split(maxsplit=1):
+            case ['to', directory]:
+                try:
+                    self.service.checkpoint(directory)
+                except OSError as error:
+                    print(f'Error: cannot write {directory}: {error.strerror}!')
+                    return
+                print(f'Saved {len(self.service)} students to {directory}.')
+            case _:
+                self.default(arg)
+
+    def do_metrics(self, arg):
+        match arg.split(maxsplit=1):
+            case _ if self.metrics is None:
+                print('Metrics are off, run with --metrics to record them.')
+            case []:
+                print(self.metrics.report())
+            case ['to', path]:
+                try:
+                    self.metrics.export(path)
+                except OSError as error:
+                    print(f'Error: cannot write {path}: {error.strerror}!')
+                    return
+                print(f'Saved histograms of {len(self.metrics.histograms)} '
+                      f'commands to {path}.')
+            case _:
+                self.default(arg)
+
+    def do_memory(self, arg):
+        """Print memory used by the students, or what a command
+        allocated: memory trace <command>, other than exit or back"""
+        match arg.split(maxsplit=1):
+            case []:
+                print(memory.report(self.service.memory(), len(self.service)))
+            case ['trace', command] if self.parseline(command)[0] not in (
+                    'exit', 'back'):
+                with memory.traced() as growth:
+                    self.onecmd(command)
+                print(memory.growth_report(growth))
+            case _:
+                self.default(arg)
+
     def do_notify(self, arg):
         match arg:
             case '':
@@ -58,23 +110,12 @@ class Tracker(Maim):
 
         pending = []
         students = 0
-        for student in self.student_data.values():
-            student_pending = False
-
-            for points, complete, course in zip(student['points'], COMPLETE_POINTS, COURSE_NAMES):
-                if points >= complete:
-                    new = (student['email'],
-                           ' '.join((student['first name'], student['last name'])),
-                           course)
-                    if new in self.sent_notifications:
-                        continue
-
-                    pending.append(new)
-                    self.sent_notifications.add(new)
-                    student_pending = True
-
-            if student_pending:
+        last_student_id = None
+        for student_id, course in self.service.pending_notifications():
+            pending.append(self.notification(student_id, course))
+            if student_id != last_student_id:
                 students += 1
+                last_student_id = student_id
 
         notifications = []
         for p in pending:
@@ -84,9 +125,16 @@ class Tracker(Maim):
 
         return ''.join(notifications)
 
+    def notification(self, student_id, course):
+        student = self.service.student(student_id)
+        return (student['email'],
+                ' '.join((student['first name'], student['last name'])),
+                COURSE_NAMES[course])
+
     def do_exit(self, arg):
         match arg:
             case '':
+                self.service.close()
                 print('Bye!')
                 return True
             case _:
@@ -105,6 +153,13 @@ class Tracker(Maim):
     def default(self, _):
         print('Error: unknown command!')
 
+    def postcmd(self, stop, line):
+        if not stop:
+            self.service.commit()
+        return stop
+
     def precmd(self, arg):
-        arg = arg.lower()
-        return arg
+        """Make line lowercase, except for a path after 'from' or 'to'"""
+        parts = re.split(r'( from | to )', arg, maxsplit=1, flags=re.I)
+        parts[:2] = [part.lower() for part in parts[:2]]
+        return ''.join(parts)
@@ -0,0 +1,179 @@
+"""Write-ahead log of tracker events
+
+The log is a file of compact binary records appended for every added
+student, points update and sent notification:
+* STUDENT: id, then lengths and UTF-8 bytes of first name,
+  last name and email,
+* POINTS: id, 4 points and 4 submission counts,
+* NOTIFY: id and course.
+
+Records are buffered and written in groups. The durability level decides
+when a group reaches the disk:
+* 'none' - written to the OS on commit, never fsynced,
+* 'batch' - fsynced once BATCH_RECORDS records have accumulated,
+  at most BATCH_SECONDS seconds after the first of them, by a timer
+  thread if nothing else is logged meanwhile, and on every commit,
+* 'always' - fsynced after every record.
+
+A record torn by a crash is dropped when the log is replayed.
+"""
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from store import Store, group_by_student
+
+MAGIC = b'LPTWAL2\n'  # Version 1 had 2-byte lengths of names
+STUDENT, POINTS, NOTIFY = 1, 2, 3
+STUDENT_HEADER = struct.Struct('<BQIII')
+POINTS_RECORD = struct.Struct('<BQ4q4I')
+NOTIFY_RECORD = struct.Struct('<BQB')
+DURABILITY = ('none', 'batch', 'always')
+
+
+class Log:
+    BATCH_RECORDS = 1000
+    BATCH_SECONDS = 1.0
+
+    def __init__(self, path, durability='batch'):
+        if durability not in DURABILITY:
+            raise ValueError(f'durability must be one of {DURABILITY}')
+        self.path = path
+        self.durability = durability
+        self.file = open(path, 'a+b')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+            self.file.flush()
+        self.buffer = bytearray()
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        self.lock = threading.RLock()  # Shared with the timer thread
+        self.timer = None
+
+    def add_students(self, students):
+        """Log (student_id, creds) pairs, all of them or none
+        if one cannot be encoded"""
+        records = []
+        for student_id, creds in students:
+            names = [creds[key].encode()
+                     for key in ('first name', 'last name', 'email')]
+            records.append(STUDENT_HEADER.pack(
+                STUDENT, student_id, *map(len, names)) + b''.join(names))
+        with self.lock:
+            for record in records:
+                self.buffer += record
+                self.appended()
+
+    def add_points(self, student_id, points, submissions):
+        with self.lock:
+            self.buffer += POINTS_RECORD.pack(
+                POINTS, student_id, *points, *submissions)
+            self.appended()
+
+    def notify(self, student_id, course):
+        with self.lock:
+            self.buffer += NOTIFY_RECORD.pack(NOTIFY, student_id, course)
+            self.appended()
+
+    def appended(self):
+        self.pending += 1
+        if self.durability == 'always':
+            self.commit()
+        elif self.durability == 'batch':
+            left = self.last_sync + self.BATCH_SECONDS - time.monotonic()
+            if self.pending >= self.BATCH_RECORDS or left <= 0:
+                self.commit()
+            elif self.timer is None:
+                # Records must reach the disk in time even if no more come
+                self.timer = threading.Timer(left, self.commit)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def commit(self):
+        """Write buffered records, fsyncing them unless durability is 'none'"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.buffer:
+                return
+            self.file.write(self.buffer)
+            self.file.flush()
+            if self.durability != 'none':
+                os.fsync(self.file.fileno())
+            self.buffer.clear()
+            self.pending = 0
+            self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.commit()
+            self.file.close()
+
+    def truncate(self):
+        """Drop all records, once they are saved elsewhere"""
+        self.commit()
+        self.file.truncate(len(MAGIC))
+        self.file.seek(0, os.SEEK_END)
+
+    def replay(self, student_data: Store):
+        """Load logged students and points into a store in bulk,
+        either an empty one or one loaded from the snapshot the log
+        was truncated at
+
+        Students are added in one batch and all points are grouped
+        by student and added with Store.add_points_bulk, which gives
+        the same state as applying records one by one.
+        """
+        self.file.seek(0)
+        data = self.file.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f'{self.path} is not a tracker log')
+
+        students, points, notifications = [], [], []
+        offset = len(MAGIC)
+        while offset < len(data):
+            kind = data[offset]
+            if kind == STUDENT and offset + STUDENT_HEADER.size <= len(data):
+                _, student_id, *lengths = STUDENT_HEADER.unpack_from(data, offset)
+                start = offset + STUDENT_HEADER.size
+                end = start + sum(lengths)
+                if end > len(data):
+                    break
+                values, position = [], start
+                for length in lengths:
+                    values.append(data[position:position + length].decode())
+                    position += length
+                students.append((student_id, dict(zip(
+                    ('first name', 'last name', 'email'), values))))
+            elif kind == POINTS and offset + POINTS_RECORD.size <= len(data):
+                points.append(POINTS_RECORD.unpack_from(data, offset)[1:])
+                end = offset + POINTS_RECORD.size
+            elif kind == NOTIFY and offset + NOTIFY_RECORD.size <= len(data):
+                notifications.append(NOTIFY_RECORD.unpack_from(data, offset)[1:])
+                end = offset + NOTIFY_RECORD.size
+            else:
+                break
+            offset = end
+
+        if offset < len(data):  # Drop a torn record
+            self.file.truncate(offset)
+        self.file.seek(0, os.SEEK_END)
+
+        if students:
+            first_id = students[0][0]
+            if not len(student_data):
+                student_data.first_id = student_data.next_id = first_id
+            elif first_id != student_data.next_id:
+                raise ValueError(f'{self.path} does not continue the loaded students')
+            student_data.add_students(creds for _, creds in students)
+        if points:
+            table = np.array(points, dtype=np.int64)
+            student_ids, points, submissions, _ = group_by_student(
+                table[:, 0], table[:, 1:5], table[:, 5:])
+            student_data.add_points_bulk(
+                student_ids.tolist(), points, submissions)
+        student_data.load_sent(notifications)